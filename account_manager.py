@@ -11,10 +11,12 @@ import logging
 import asyncio
 import re
 import sqlite3
+import weakref
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional, Union, Any, TypeVar, Callable, Coroutine, Set, DefaultDict
+from typing import Dict, List, Tuple, Optional, Union, Any, TypeVar, Callable, Coroutine, Set, DefaultDict, ValuesView
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import pytz
 from telethon import TelegramClient, types, functions, errors
@@ -70,8 +72,63 @@ DEFAULT_CONFIG = {
     'auto_reconnect_max_retries': 10,
     'auto_reconnect_base_delay': 1.0,  # 1 second
     'auto_reconnect_max_delay': 60.0,  # 1 minute
+    'auto_reconnect_debounce': 0.25,  # 250 ms to gather simultaneous drops
+    'wal_checkpoint_interval': 300,  # 5 minutes
 }
 
+# Connection settings for the accounts database: WAL with relaxed fsync
+DB_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+PRAGMA busy_timeout=5000;
+PRAGMA mmap_size=268435456;
+PRAGMA wal_autocheckpoint=0;
+"""
+
+# Accounts database schema
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS accounts (
+    phone TEXT PRIMARY KEY,
+    api_id INTEGER,
+    api_hash TEXT,
+    session_string TEXT,
+    status TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_used TIMESTAMP,
+    daily_requests INTEGER DEFAULT 0,
+    last_reset TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_active BOOLEAN DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS request_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_phone TEXT,
+    request_type TEXT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    success BOOLEAN,
+    response_time REAL,
+    error_message TEXT,
+    FOREIGN KEY (account_phone) REFERENCES accounts(phone) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_account_status ON accounts(status, is_active);
+CREATE INDEX IF NOT EXISTS idx_request_history ON request_history(account_phone, timestamp);
+"""
+
+
+def _close_db_handle(executor: ThreadPoolExecutor, connection: sqlite3.Connection) -> None:
+    """Finalizer for managers that were never closed: release the sqlite handle.
+    
+    The connection belongs to the database thread, so the close is handed to it.
+    """
+    try:
+        executor.submit(connection.close)
+        executor.shutdown(wait=False)
+    except Exception:
+        pass
+
 
 class AccountError(Exception):
     """Base exception for account-related errors."""
@@ -162,20 +219,28 @@ class TelegramAccountManager:
         Args:
             config: Configuration dictionary. If None, default config will be used.
         """
-        self.accounts: List[Dict[str, Any]] = []
-        self.active_accounts: List[Dict[str, Any]] = []
-        self.limited_accounts: List[Dict[str, Any]] = []
-        self.banned_accounts: List[Dict[str, Any]] = []
+        self._accounts_by_phone: Dict[str, Dict[str, Any]] = {}
+        self.active_accounts: Dict[str, Dict[str, Any]] = {}
+        self.limited_accounts: Dict[str, Dict[str, Any]] = {}
+        self.banned_accounts: Dict[str, Dict[str, Any]] = {}
+        # Small stable int per phone, for callers keying hot per-account state
+        self._idx_by_phone: Dict[str, int] = {}
         self._config_lock = asyncio.Lock()
         self._clients: Dict[str, TelegramClient] = {}
         self._config = {**DEFAULT_CONFIG, **(config or {})}
         self._account_locks: DefaultDict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
-        self._reconnect_tasks: Dict[str, asyncio.Task] = {}
-        self._reconnect_events: Dict[str, asyncio.Event] = {}
+        self._reconnect_pending: Set[str] = set()
+        self._reconnect_attempts: Dict[str, int] = {}
+        self._reconnect_event = asyncio.Event()
+        self._reconnect_task: Optional[asyncio.Task] = None
         self._is_running = False
         self._shutdown_event = asyncio.Event()
         self._initialized = False
         self._db_connection = None
+        # The single worker owns the sqlite connection and serializes all writes
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-writer')
+        self._checkpoint_task: Optional[asyncio.Task] = None
+        self._finalizer: Optional[weakref.finalize] = None
         
         # Setup logging
         self._setup_logging()
@@ -188,12 +253,12 @@ class TelegramAccountManager:
         Call this after the event loop is running.
         """
         if not self._initialized:
-            # Initialize database connection
-            self._db_connection = sqlite3.connect(
-                os.path.join(self._config['sessions_path'], 'accounts.db'),
-                check_same_thread=False
+            # Initialize database connection on the database thread
+            self._db_connection = await self._run_db(self._open_database)
+            self._finalizer = weakref.finalize(
+                self, _close_db_handle, self._db_executor, self._db_connection
             )
-            self._setup_database()
+            self._checkpoint_task = asyncio.create_task(self._periodic_checkpoint())
             
             # Load accounts
             await self._load_accounts_async()
@@ -204,52 +269,44 @@ class TelegramAccountManager:
         os.makedirs(self._config['sessions_path'], exist_ok=True)
         os.makedirs(self._config['logs_path'], exist_ok=True)
     
+    async def _run_db(self, func: Callable[..., T], *args) -> T:
+        """Run a blocking sqlite call on the database thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, func, *args)
+    
+    def _open_database(self) -> sqlite3.Connection:
+        """Open and prepare the accounts database. Runs on the database thread."""
+        connection = sqlite3.connect(
+            os.path.join(self._config['sessions_path'], 'accounts.db'),
+            cached_statements=256
+        )
+        connection.executescript(DB_PRAGMAS)
+        self._db_connection = connection
+        self._setup_database()
+        return connection
+    
     def _setup_database(self) -> None:
         """Set up the SQLite database with required tables."""
         try:
-            cursor = self._db_connection.cursor()
-            
-            # Create accounts table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS accounts (
-                    phone TEXT PRIMARY KEY,
-                    api_id INTEGER,
-                    api_hash TEXT,
-                    session_string TEXT,
-                    status TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_used TIMESTAMP,
-                    daily_requests INTEGER DEFAULT 0,
-                    last_reset TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT 1
-                )
-            ''')
-            
-            # Create request history table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS request_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    account_phone TEXT,
-                    request_type TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    success BOOLEAN,
-                    response_time REAL,
-                    error_message TEXT,
-                    FOREIGN KEY (account_phone) REFERENCES accounts(phone) ON DELETE CASCADE
-                )
-            ''')
-            
-            # Create indexes for better performance
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_account_status ON accounts(status, is_active)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_request_history ON request_history(account_phone, timestamp)')
-            
-            self._db_connection.commit()
+            # One transaction for the whole schema instead of one per statement
+            self._db_connection.executescript(f"BEGIN;\n{SCHEMA_SQL}\nCOMMIT;")
             logging.info("Database setup completed successfully")
             
         except sqlite3.Error as e:
             logging.error(f"Error setting up database: {e}")
             raise
     
+    async def _periodic_checkpoint(self) -> None:
+        """Checkpoint the WAL on a timer instead of on commit."""
+        interval = self._config['wal_checkpoint_interval']
+        while not self._shutdown_event.is_set():
+            try:
+                await asyncio.sleep(interval)
+                await self._run_db(self._db_connection.execute, 'PRAGMA wal_checkpoint(TRUNCATE)')
+            except asyncio.CancelledError:
+                break
+            except sqlite3.Error as e:
+                logging.warning(f"WAL checkpoint failed: {e}")
+    
     async def _load_accounts_async(self) -> None:
         """Asynchronously load accounts from the sessions directory."""
         try:
@@ -302,15 +359,15 @@ class TelegramAccountManager:
                                     'saved_messages': []
                                 }
                                 
-                                self.accounts.append(account)
-                                self.active_accounts.append(account)
+                                self._register_account(account)
+                                self.active_accounts[account['phone']] = account
                                 self._clients[phone] = client
                                 
                                 logging.info(f"Successfully loaded account: {phone} ({me.first_name} {me.last_name or ''} @{me.username or 'N/A'})")
                                 
                                 # Start auto-reconnect if enabled
                                 if self._config['auto_reconnect']:
-                                    asyncio.create_task(self._auto_reconnect_loop(phone))
+                                    self._start_auto_reconnect()
                                 
                             except Exception as e:
                                 logging.error(f"Error loading account {phone}: {e}")
@@ -355,6 +412,23 @@ class TelegramAccountManager:
         
         return client
     
+    def _client_for(self, phone: str) -> Optional[TelegramClient]:
+        """Get the client for an account, creating it on first use.
+        
+        Accounts restored from disk are kept without a client so idle accounts
+        don't open a session file each; the client is built and cached the
+        first time something actually needs it.
+        """
+        account = self.get_account(phone)
+        if not account:
+            return None
+        
+        # A reload can leave the account dict without the client still cached here
+        client = self._clients.get(phone) or account.get('client') or self._create_client(phone)
+        account['client'] = client
+        self._clients[phone] = client
+        return client
+    
     def _setup_logging(self) -> None:
         """Set up logging configuration."""
         logging.basicConfig(
@@ -369,12 +443,50 @@ class TelegramAccountManager:
         # Set log level for telethon
         logging.getLogger('telethon').setLevel(logging.WARNING)
     
+    @property
+    def accounts(self) -> ValuesView[Dict[str, Any]]:
+        """Live view of all managed accounts."""
+        return self._accounts_by_phone.values()
+    
     def get_account(self, phone: str) -> Optional[Dict[str, Any]]:
         """Get an account by phone number."""
-        for account in self.accounts:
-            if account.get('phone') == phone:
-                return account
-        return None
+        return self._accounts_by_phone.get(phone)
+    
+    def _register_account(self, account: Dict[str, Any]) -> None:
+        """Add an account to the manager, keyed by phone number."""
+        account['idx'] = self._index_for(account['phone'])
+        self._accounts_by_phone[account['phone']] = account
+    
+    def _index_for(self, phone: str) -> int:
+        """Return the account index for a phone, assigning the next one on first sight."""
+        return self._idx_by_phone.setdefault(phone, len(self._idx_by_phone))
+    
+    def _unregister_account(self, account: Dict[str, Any]) -> None:
+        """Drop an account from the manager and all status buckets."""
+        phone = account.get('phone')
+        self._accounts_by_phone.pop(phone, None)
+        self.active_accounts.pop(phone, None)
+        self.limited_accounts.pop(phone, None)
+        self.banned_accounts.pop(phone, None)
+    
+    def _commit_status(self, account: Dict[str, Any], status: str) -> None:
+        """Set an account's status and move it between the status buckets."""
+        phone = account['phone']
+        account['status'] = status
+        account['updated_at'] = datetime.now(pytz.UTC)
+        
+        if status == 'active':
+            self.active_accounts[phone] = account
+            self.limited_accounts.pop(phone, None)
+            self.banned_accounts.pop(phone, None)
+        elif status == 'banned':
+            self.active_accounts.pop(phone, None)
+            self.limited_accounts.pop(phone, None)
+            self.banned_accounts[phone] = account
+        else:  # inactive, flood_wait, error
+            self.active_accounts.pop(phone, None)
+            self.limited_accounts[phone] = account
+            self.banned_accounts.pop(phone, None)
     
     @staticmethod
     def _validate_phone_number(phone: str) -> bool:
@@ -493,13 +605,13 @@ class TelegramAccountManager:
             }
             
             # Save account
-            self.accounts.append(account)
-            self.active_accounts.append(account)
+            self._register_account(account)
+            self.active_accounts[account['phone']] = account
             self._clients[phone] = client
             
             # Start auto-reconnect if enabled
             if self._config['auto_reconnect']:
-                asyncio.create_task(self._auto_reconnect_loop(phone))
+                self._start_auto_reconnect()
             
             return True, f"Successfully added account: @{me.username or me.id} ({me.first_name} {me.last_name or ''})"
             
@@ -537,13 +649,9 @@ class TelegramAccountManager:
         if not account:
             return False, f"Account {phone} not found"
         
-        # Cancel any pending reconnection tasks
-        if phone in self._reconnect_tasks:
-            self._reconnect_tasks[phone].cancel()
-            del self._reconnect_tasks[phone]
-        
-        if phone in self._reconnect_events:
-            del self._reconnect_events[phone]
+        # Drop any pending reconnection
+        self._reconnect_pending.discard(phone)
+        self._reconnect_attempts.pop(phone, None)
         
         # Disconnect client if connected
         client = account.get('client')
@@ -554,14 +662,7 @@ class TelegramAccountManager:
                 logging.warning(f"Error disconnecting client for {phone}: {e}")
         
         # Remove from account lists
-        if account in self.accounts:
-            self.accounts.remove(account)
-        if account in self.active_accounts:
-            self.active_accounts.remove(account)
-        if account in self.limited_accounts:
-            self.limited_accounts.remove(account)
-        if account in self.banned_accounts:
-            self.banned_accounts.remove(account)
+        self._unregister_account(account)
         
         # Delete session file if requested
         if delete_session:
@@ -595,11 +696,7 @@ class TelegramAccountManager:
         if account.get('is_connected'):
             return True, f"Account {phone} is already connected"
         
-        client = account.get('client')
-        if not client:
-            client = self._create_client(phone)
-            account['client'] = client
-            self._clients[phone] = client
+        client = self._client_for(phone)
         
         try:
             await client.connect()
@@ -614,15 +711,13 @@ class TelegramAccountManager:
             account['last_online'] = datetime.now(pytz.UTC)
             
             # Update account lists
-            if account not in self.active_accounts:
-                self.active_accounts.append(account)
+            self.active_accounts[account['phone']] = account
             
-            if account in self.limited_accounts:
-                self.limited_accounts.remove(account)
+            self.limited_accounts.pop(account['phone'], None)
             
             # Start auto-reconnect if enabled
-            if self._config['auto_reconnect'] and phone not in self._reconnect_tasks:
-                asyncio.create_task(self._auto_reconnect_loop(phone))
+            if self._config['auto_reconnect']:
+                self._start_auto_reconnect()
             
             return True, f"Successfully connected account {phone}"
             
@@ -631,11 +726,9 @@ class TelegramAccountManager:
             account['status'] = 'flood_wait'
             account['last_error'] = f"Flood wait for {wait_time} seconds"
             
-            if account in self.active_accounts:
-                self.active_accounts.remove(account)
+            self.active_accounts.pop(account['phone'], None)
             
-            if account not in self.limited_accounts:
-                self.limited_accounts.append(account)
+            self.limited_accounts[account['phone']] = account
             
             return False, f"Flood wait error. Please try again in {wait_time} seconds"
             
@@ -647,11 +740,9 @@ class TelegramAccountManager:
             if account['error_count'] >= 5:  # Too many errors, mark as limited
                 account['status'] = 'error'
                 
-                if account in self.active_accounts:
-                    self.active_accounts.remove(account)
+                self.active_accounts.pop(account['phone'], None)
                 
-                if account not in self.limited_accounts:
-                    self.limited_accounts.append(account)
+                self.limited_accounts[account['phone']] = account
             
             return False, error_msg
             
@@ -662,11 +753,9 @@ class TelegramAccountManager:
             account['last_error'] = str(e)
             account['error_count'] = account.get('error_count', 0) + 1
             
-            if account in self.active_accounts:
-                self.active_accounts.remove(account)
+            self.active_accounts.pop(account['phone'], None)
             
-            if account not in self.limited_accounts:
-                self.limited_accounts.append(account)
+            self.limited_accounts[account['phone']] = account
             
             return False, error_msg
     
@@ -686,13 +775,8 @@ class TelegramAccountManager:
         if not account.get('is_connected'):
             return True, f"Account {phone} is already disconnected"
         
-        # Cancel any pending reconnection tasks
-        if phone in self._reconnect_tasks:
-            self._reconnect_tasks[phone].cancel()
-            del self._reconnect_tasks[phone]
-        
-        if phone in self._reconnect_events:
-            del self._reconnect_events[phone]
+        # Drop any pending reconnection
+        self._reconnect_pending.discard(phone)
         
         client = account.get('client')
         if client and client.is_connected():
@@ -701,8 +785,7 @@ class TelegramAccountManager:
                 account['is_connected'] = False
                 account['status'] = 'offline'
                 
-                if account in self.active_accounts:
-                    self.active_accounts.remove(account)
+                self.active_accounts.pop(account['phone'], None)
                 
                 return True, f"Successfully disconnected account {phone}"
                 
@@ -748,6 +831,7 @@ class TelegramAccountManager:
         status = {
             'exists': True,
             'phone': account['phone'],
+            'idx': account.get('idx'),
             'user_id': account.get('user_id'),
             'username': account.get('username'),
             'first_name': account.get('first_name'),
@@ -869,81 +953,75 @@ class TelegramAccountManager:
     
     async def get_all_accounts_status(self) -> List[Dict[str, Any]]:
         """Get status for all accounts."""
-        return [await self.get_account_status(acc['phone']) for acc in self.accounts]
+        return [await self.get_account_status(acc['phone']) for acc in list(self.accounts)]
     
-    async def _auto_reconnect_loop(self, phone: str) -> None:
-        """Automatically reconnect an account if it gets disconnected."""
-        if phone in self._reconnect_tasks:
+    def request_reconnect(self, phone: str) -> None:
+        """Queue an account for the next reconnect wave."""
+        if self._shutdown_event.is_set():
             return
-        
-        self._reconnect_events[phone] = asyncio.Event()
-        self._reconnect_tasks[phone] = asyncio.create_task(self._auto_reconnect_task(phone))
+        self._reconnect_pending.add(phone)
+        self._reconnect_event.set()
+        self._start_auto_reconnect()
+    
+    def _start_auto_reconnect(self) -> None:
+        """Start the shared auto-reconnect task if it is not running yet."""
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._auto_reconnect_loop())
     
-    async def _auto_reconnect_task(self, phone: str) -> None:
-        """Background task to handle automatic reconnection for an account."""
-        reconnect_event = self._reconnect_events[phone]
-        reconnect_attempts = 0
+    async def _auto_reconnect_loop(self) -> None:
+        """Reconnect queued accounts in debounced, concurrent waves.
+        
+        When many accounts drop at once (e.g. a network outage) their requests
+        are collected for a short window, reconnected together and their status
+        changes written in one batch.
+        """
+        loop = asyncio.get_running_loop()
         max_attempts = self._config['auto_reconnect_max_retries']
         
         while not self._shutdown_event.is_set():
             try:
-                # Wait for a disconnect event or shutdown
-                await reconnect_event.wait()
-                
-                # Check if we should still try to reconnect
-                if self._shutdown_event.is_set():
-                    break
-                
-                account = self.get_account(phone)
-                if not account:
-                    logging.warning(f"Account {phone} not found, stopping auto-reconnect")
-                    break
+                await self._reconnect_event.wait()
+                await asyncio.sleep(self._config['auto_reconnect_debounce'])
+                self._reconnect_event.clear()
                 
-                # Reset the event
-                reconnect_event.clear()
+                phones = [phone for phone in self._reconnect_pending if phone in self._accounts_by_phone]
+                self._reconnect_pending.clear()
+                if not phones:
+                    continue
                 
-                # Calculate backoff delay
-                delay = min(
-                    self._config['auto_reconnect_base_delay'] * (2 ** reconnect_attempts),
-                    self._config['auto_reconnect_max_delay']
+                logging.info(f"Reconnecting {len(phones)} account(s)")
+                results = await asyncio.gather(
+                    *(self.reconnect_account(phone) for phone in phones),
+                    return_exceptions=True
                 )
                 
-                logging.info(f"Waiting {delay:.1f}s before reconnecting {phone} (attempt {reconnect_attempts + 1}/{max_attempts})")
-                await asyncio.sleep(delay)
-                
-                # Try to reconnect
-                success, _ = await self.reconnect_account(phone)
-                if success:
-                    logging.info(f"Successfully reconnected account {phone}")
-                    reconnect_attempts = 0
-                else:
-                    reconnect_attempts += 1
-                    if reconnect_attempts >= max_attempts:
+                for phone, result in zip(phones, results):
+                    if not isinstance(result, BaseException) and result[0]:
+                        logging.info(f"Successfully reconnected account {phone}")
+                        self._reconnect_attempts.pop(phone, None)
+                        continue
+                    
+                    attempts = self._reconnect_attempts.get(phone, 0) + 1
+                    if attempts >= max_attempts:
                         logging.error(f"Max reconnection attempts reached for {phone}, giving up")
-                        break
+                        self._reconnect_attempts.pop(phone, None)
+                        continue
+                    self._reconnect_attempts[phone] = attempts
                     
-                    # Trigger another reconnection attempt
-                    reconnect_event.set()
+                    # Back off before queueing this account again
+                    delay = min(
+                        self._config['auto_reconnect_base_delay'] * (2 ** attempts),
+                        self._config['auto_reconnect_max_delay']
+                    )
+                    logging.info(f"Retrying {phone} in {delay:.1f}s (attempt {attempts + 1}/{max_attempts})")
+                    loop.call_later(delay, self.request_reconnect, phone)
                 
             except asyncio.CancelledError:
-                logging.info(f"Auto-reconnect task for {phone} was cancelled")
+                logging.info("Auto-reconnect task was cancelled")
                 break
             except Exception as e:
-                logging.error(f"Error in auto-reconnect task for {phone}: {e}")
-                reconnect_attempts += 1
-                if reconnect_attempts >= max_attempts:
-                    logging.error(f"Max reconnection attempts reached for {phone}, giving up")
-                    break
-                
-                # Wait a bit before retrying
+                logging.error(f"Error in auto-reconnect task: {e}")
                 await asyncio.sleep(5)
-                reconnect_event.set()
-        
-        # Clean up
-        if phone in self._reconnect_events:
-            del self._reconnect_events[phone]
-        if phone in self._reconnect_tasks:
-            del self._reconnect_tasks[phone]
     
     async def update_account_status(self, phone: str, status: str) -> bool:
         """Update the status of an account.
@@ -963,31 +1041,7 @@ class TelegramAccountManager:
         if status not in valid_statuses:
             return False
         
-        account['status'] = status
-        account['updated_at'] = datetime.now(pytz.UTC)
-        
-        # Update account lists
-        if status == 'active':
-            if account not in self.active_accounts:
-                self.active_accounts.append(account)
-            if account in self.limited_accounts:
-                self.limited_accounts.remove(account)
-            if account in self.banned_accounts:
-                self.banned_accounts.remove(account)
-        elif status == 'banned':
-            if account in self.active_accounts:
-                self.active_accounts.remove(account)
-            if account in self.limited_accounts:
-                self.limited_accounts.remove(account)
-            if account not in self.banned_accounts:
-                self.banned_accounts.append(account)
-        else:  # inactive, flood_wait, error
-            if account in self.active_accounts:
-                self.active_accounts.remove(account)
-            if account not in self.limited_accounts:
-                self.limited_accounts.append(account)
-            if account in self.banned_accounts:
-                self.banned_accounts.remove(account)
+        self._commit_status(account, status)
         
         return True
     
@@ -1144,29 +1198,56 @@ class TelegramAccountManager:
         """Clean up resources and close all connections."""
         self._shutdown_event.set()
         
-        # Cancel all reconnection tasks
-        for task in self._reconnect_tasks.values():
-            task.cancel()
-        
-        # Disconnect all clients
-        for account in self.accounts:
-            client = account.get('client')
-            if client and client.is_connected():
-                try:
-                    await client.disconnect()
-                except Exception as e:
-                    logging.error(f"Error disconnecting client for {account.get('phone')}: {e}")
+        # Cancel the reconnection task
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        
+        # Stop the checkpoint task
+        if self._checkpoint_task:
+            self._checkpoint_task.cancel()
+            self._checkpoint_task = None
+        
+        if self._finalizer:
+            self._finalizer.detach()
+            self._finalizer = None
+        if self._db_connection:
+            await self._run_db(self._db_connection.close)
+            self._db_connection = None
+        self._db_executor.shutdown(wait=False)
+        
+        # Disconnect all clients concurrently
+        clients = [
+            (account.get('phone'), account['client'])
+            for account in self.accounts
+            if account.get('client') and account['client'].is_connected()
+        ]
+        if hasattr(asyncio, 'TaskGroup'):
+            async with asyncio.TaskGroup() as tg:
+                for phone, client in clients:
+                    tg.create_task(self._disconnect_client(phone, client))
+        else:
+            await asyncio.gather(
+                *(self._disconnect_client(phone, client) for phone, client in clients)
+            )
         
         # Clear all data structures
-        self.accounts.clear()
+        self._accounts_by_phone.clear()
         self.active_accounts.clear()
         self.limited_accounts.clear()
         self.banned_accounts.clear()
         self._clients.clear()
-        self._reconnect_tasks.clear()
-        self._reconnect_events.clear()
+        self._reconnect_pending.clear()
+        self._reconnect_attempts.clear()
         self._account_locks.clear()
     
+    async def _disconnect_client(self, phone: str, client: TelegramClient) -> None:
+        """Disconnect one client, logging failures so sibling disconnects still run."""
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logging.error(f"Error disconnecting client for {phone}: {e}")
+    
     async def __aenter__(self):
         """Async context manager entry."""
         return self
@@ -1174,18 +1255,6 @@ class TelegramAccountManager:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
         await self.close()
-    
-    def __del__(self):
-        """Destructor to ensure cleanup."""
-        if not self._shutdown_event.is_set():
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    asyncio.create_task(self.close())
-                else:
-                    loop.run_until_complete(self.close())
-            except Exception as e:
-                logging.error(f"Error during cleanup: {e}", exc_info=True)
 
     def load_config(self, config_path: str) -> Dict[str, Any]:
         """Load and validate configuration from JSON file.
@@ -1315,7 +1384,7 @@ class TelegramAccountManager:
             return False, "Invalid API hash"
             
         # Check if account already exists
-        if any(acc['phone'] == phone for acc in self.accounts):
+        if phone in self._accounts_by_phone:
             return False, f"Account {phone} already exists"
         
         # Create account data structure
@@ -1338,8 +1407,8 @@ class TelegramAccountManager:
         
         if success:
             async with self._config_lock:
-                self.accounts.append(account_data)
-                self.active_accounts.append(account_data)
+                self._register_account(account_data)
+                self.active_accounts[account_data['phone']] = account_data
                 account_data['status'] = 'active'
                 
             logging.info(f"Successfully added account: {phone}")
@@ -1537,8 +1606,7 @@ class TelegramAccountManager:
                         account['error_count'] = 0
                         
                         # Add to active accounts if not already present
-                        if account not in self.active_accounts:
-                            self.active_accounts.append(account)
+                        self.active_accounts[account['phone']] = account
                     
                     # Get and store user info
                     try:
@@ -1579,10 +1647,8 @@ class TelegramAccountManager:
             
             # Move to limited accounts if too many errors
             if account['error_count'] >= 3:
-                if account in self.active_accounts:
-                    self.active_accounts.remove(account)
-                if account not in self.limited_accounts:
-                    self.limited_accounts.append(account)
+                self.active_accounts.pop(account['phone'], None)
+                self.limited_accounts[account['phone']] = account
         
         return False, f"Authentication failed after {max_retries} attempts: {last_error}"
     
@@ -1598,10 +1664,7 @@ class TelegramAccountManager:
         if not phone:
             return None
             
-        for account in self.accounts:
-            if account.get('phone') == phone:
-                return account
-        return None
+        return self._accounts_by_phone.get(phone)
         
     def get_account_by_id(self, user_id: Union[int, str]) -> Optional[Dict]:
         """Get account by Telegram user ID.
@@ -1649,8 +1712,8 @@ class TelegramAccountManager:
             'last_activity': account.get('last_activity'),
             'created_at': account.get('created_at'),
             'error_count': account.get('error_count', 0),
-            'is_active': account in self.active_accounts,
-            'is_limited': account in self.limited_accounts
+            'is_active': account['phone'] in self.active_accounts,
+            'is_limited': account['phone'] in self.limited_accounts
         }
         
         # Add connection status if client is available
@@ -1680,9 +1743,9 @@ class TelegramAccountManager:
         available_accounts = []
         
         async with self._config_lock:
-            for account in self.active_accounts:
+            for account in self.active_accounts.values():
                 # Skip if account is not in a usable state
-                if account.get('status') != 'active' or account in self.limited_accounts:
+                if account.get('status') != 'active' or account['phone'] in self.limited_accounts:
                     continue
                     
                 # Reset daily counter if new day
@@ -1710,6 +1773,10 @@ class TelegramAccountManager:
         available_accounts.sort(key=lambda x: x[0], reverse=True)
         best_account = available_accounts[0][1]
         
+        # Accounts loaded from disk get their client on first selection
+        if not best_account.get('client'):
+            self._client_for(best_account['phone'])
+        
         # Update last activity
         best_account['last_activity'] = datetime.now()
         best_account['added_today'] = best_account.get('added_today', 0) + 1
@@ -1748,8 +1815,8 @@ class TelegramAccountManager:
         
         status_counts = {}
         
-        # Process each account
-        for account in self.accounts:
+        # Process each account (snapshot, the loop awaits)
+        for account in list(self.accounts):
             status = account.get('status', 'unknown')
             
             # Update status counts
@@ -1774,8 +1841,8 @@ class TelegramAccountManager:
                 'remaining': max(0, self.config.get('daily_limit', 45) - account.get('added_today', 0)),
                 'last_activity': account.get('last_activity', {}).isoformat() if account.get('last_activity') else None,
                 'time_since_activity': time_since_activity_str,
-                'is_active': account in self.active_accounts,
-                'is_limited': account in self.limited_accounts,
+                'is_active': account['phone'] in self.active_accounts,
+                'is_limited': account['phone'] in self.limited_accounts,
                 'error_count': account.get('error_count', 0)
             }
             
@@ -1924,7 +1991,11 @@ class TelegramAccountManager:
                 logging.error(f"Invalid accounts data format in {filename}")
                 return False
             
-            loaded_count = 0
+            loaded: Dict[str, Dict[str, Any]] = {}
+            date_fields = ('last_reset', 'created_at', 'last_activity')
+            _from_iso = datetime.fromisoformat
+            _str = str
+            _now = datetime.now()
             async with self._config_lock:
                 for account_data in accounts_data:
                     try:
@@ -1934,35 +2005,34 @@ class TelegramAccountManager:
                             continue
                             
                         # Convert string dates back to datetime objects
-                        date_fields = ['last_reset', 'created_at', 'last_activity']
                         for field in date_fields:
-                            if field in account_data and account_data[field]:
-                                if isinstance(account_data[field], str):
-                                    try:
-                                        account_data[field] = datetime.fromisoformat(account_data[field])
-                                    except (ValueError, TypeError) as e:
-                                        logging.warning(f"Invalid date format for {field}: {e}")
-                                        account_data[field] = datetime.now()
+                            value = account_data.get(field)
+                            if value and type(value) is _str:
+                                try:
+                                    account_data[field] = _from_iso(value)
+                                except ValueError as e:
+                                    logging.warning(f"Invalid date format for {field}: {e}")
+                                    account_data[field] = _now
                                 
                         # Initialize client as None - will be created when needed
                         account_data['client'] = None
-                        
-                        # Add to appropriate lists
-                        self.accounts.append(account_data)
-                        status = account_data.get('status', 'unknown')
-                        
-                        if status == 'active':
-                            self.active_accounts.append(account_data)
-                        elif status == 'limited':
-                            self.limited_accounts.append(account_data)
-                            
-                        loaded_count += 1
+                        account_data['idx'] = self._index_for(account_data['phone'])
+                        loaded[account_data['phone']] = account_data
                         
                     except Exception as e:
                         logging.error(f"Error loading account data: {e}")
                         continue
+                
+                # Index and bucket everything in one pass per map
+                self._accounts_by_phone.update(loaded)
+                self.active_accounts.update(
+                    {phone: acc for phone, acc in loaded.items() if acc.get('status') == 'active'}
+                )
+                self.limited_accounts.update(
+                    {phone: acc for phone, acc in loaded.items() if acc.get('status') == 'limited'}
+                )
             
-            logging.info(f"Successfully loaded {loaded_count} accounts from {filename}")
+            logging.info(f"Successfully loaded {len(loaded)} accounts from {filename}")
             return True
             
         except json.JSONDecodeError as e:
@@ -2097,8 +2167,7 @@ class TelegramAccountManager:
             async with self._config_lock:
                 account['client'] = None
                 account['status'] = 'disconnected'
-                if account in self.active_accounts:
-                    self.active_accounts.remove(account)
+                self.active_accounts.pop(account['phone'], None)
                 
             logging.info(f"Successfully disconnected account {phone}")
             return True, "Successfully disconnected account"
@@ -2130,10 +2199,8 @@ class TelegramAccountManager:
         if success:
             async with self._config_lock:
                 account['status'] = 'active'
-                if account not in self.active_accounts:
-                    self.active_accounts.append(account)
-                if account in self.limited_accounts:
-                    self.limited_accounts.remove(account)
+                self.active_accounts[account['phone']] = account
+                self.limited_accounts.pop(account['phone'], None)
                     
             logging.info(f"Successfully reconnected account {phone}")
             return True, "Successfully reconnected account"
@@ -2177,12 +2244,7 @@ class TelegramAccountManager:
         
         # Remove from all lists
         async with self._config_lock:
-            if account in self.accounts:
-                self.accounts.remove(account)
-            if account in self.active_accounts:
-                self.active_accounts.remove(account)
-            if account in self.limited_accounts:
-                self.limited_accounts.remove(account)
+            self._unregister_account(account)
         
         logging.info(f"Removed account {phone} from manager")
         return True, "Account removed successfully"
@@ -2212,13 +2274,3 @@ class TelegramAccountManager:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit - ensures cleanup."""
         await self.cleanup()
-    
-    def __del__(self):
-        """Destructor - ensures cleanup."""
-        if hasattr(self, 'accounts'):
-            for account in self.accounts:
-                if account.get('client') and account['client'].is_connected():
-                    try:
-                        asyncio.create_task(account['client'].disconnect())
-                    except:
-                        pass
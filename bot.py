@@ -9,10 +9,13 @@ import os
 import sys
 import json
 import logging
+import logging.handlers
+import queue
 import asyncio
 import signal
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union, Any, Callable, Coroutine
+from typing import Dict, FrozenSet, List, Optional, Set, Union, Any, Callable, Coroutine
 from pathlib import Path
 
 import pytz
@@ -33,28 +36,73 @@ from telegram.error import (
 from account_manager import TelegramAccountManager
 from forwarding_manager import TelegramForwardingManager
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/bot.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 # Conversation states
 MAIN_MENU, ACCOUNT_MENU, FORWARD_MENU, MEMBER_MENU, SETTINGS_MENU = range(5)
 
+# Configuration
+REQUIRED_CONFIG_FIELDS = ('bot_token', 'authorized_users')
+CONFIG_DEFAULTS = {
+    'delay_min': 15,
+    'delay_max': 45,
+    'daily_limit': 45,
+    'check_interval': 3600,
+    'max_flood_wait': 300,
+    'retry_attempts': 3,
+    'database_path': 'forwarding.db',
+    'sessions_path': 'sessions',
+    'logs_path': 'logs'
+}
+
 class TelegramManagerBot:
     """Main bot class for managing Telegram accounts and forwarding."""
     
+    # Static menu keyboards, built once
+    _MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+        [InlineKeyboardButton("👤 Account Manager", callback_data="account_menu")],
+        [InlineKeyboardButton("📨 Auto Forwarding", callback_data="forward_menu")],
+        [InlineKeyboardButton("👥 Member Manager", callback_data="member_menu")],
+        [InlineKeyboardButton("📊 Status & Reports", callback_data="status_menu")],
+        [InlineKeyboardButton("⚙️ Settings", callback_data="settings_menu")]
+    ])
+    _ACCOUNT_MENU_MARKUP = InlineKeyboardMarkup([
+        [InlineKeyboardButton("➕ Add Account", callback_data="add_account")],
+        [InlineKeyboardButton("📋 List Accounts", callback_data="list_accounts")],
+        [InlineKeyboardButton("🔄 Update Account", callback_data="update_account")],
+        [InlineKeyboardButton("❌ Remove Account", callback_data="remove_account")],
+        [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
+    ])
+    _FORWARD_MENU_MARKUP = InlineKeyboardMarkup([
+        [InlineKeyboardButton("➕ Add Rule", callback_data="add_rule")],
+        [InlineKeyboardButton("📋 List Rules", callback_data="list_rules")],
+        [InlineKeyboardButton("⚙️ Edit Rule", callback_data="edit_rule")],
+        [InlineKeyboardButton("❌ Remove Rule", callback_data="remove_rule")],
+        [InlineKeyboardButton("▶️ Start All", callback_data="start_all_rules")],
+        [InlineKeyboardButton("⏹️ Stop All", callback_data="stop_all_rules")],
+        [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
+    ])
+    _MEMBER_MENU_MARKUP = InlineKeyboardMarkup([
+        [InlineKeyboardButton("👥 Add Members", callback_data="add_members")],
+        [InlineKeyboardButton("👤 Remove Members", callback_data="remove_members")],
+        [InlineKeyboardButton("📊 Member Stats", callback_data="member_stats")],
+        [InlineKeyboardButton("📋 Export Members", callback_data="export_members")],
+        [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
+    ])
+    _SETTINGS_MENU_MARKUP = InlineKeyboardMarkup([
+        [InlineKeyboardButton("⚙️ Bot Settings", callback_data="bot_settings")],
+        [InlineKeyboardButton("📊 Performance", callback_data="performance_settings")],
+        [InlineKeyboardButton("🔐 Security", callback_data="security_settings")],
+        [InlineKeyboardButton("📝 Logs", callback_data="view_logs")],
+        [InlineKeyboardButton("🔄 Update", callback_data="check_updates")],
+        [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
+    ])
+    
     def __init__(self, config: Dict[str, Any]):
         """Initialize the bot with configuration."""
         self.config = config
         self.bot_token = config['bot_token']
-        self.authorized_users = set(config['authorized_users'])
+        self.authorized_users: FrozenSet[int] = frozenset(int(u) for u in config['authorized_users'])
         
         # Initialize managers
         self.account_manager = TelegramAccountManager(config)
@@ -63,17 +111,16 @@ class TelegramManagerBot:
         # Bot application instance
         self.application = None
         
+        # Background tasks started by the bot itself
+        self._owned_tasks: Set[asyncio.Task] = set()
+        
         # Load existing accounts and rules
         self._load_initial_data()
-        
-        # Register signal handlers
-        self._register_signal_handlers()
     
     def _load_initial_data(self) -> None:
         """Load initial data like accounts and forwarding rules."""
         try:
-            # Load accounts
-            self.account_manager.load_accounts()
+            # Accounts are loaded by the account manager itself
             logger.info(f"Loaded {len(self.account_manager.accounts)} accounts")
             
             # Load forwarding rules
@@ -84,22 +131,34 @@ class TelegramManagerBot:
             logger.error(f"Error loading initial data: {e}", exc_info=True)
     
     def _register_signal_handlers(self) -> None:
-        """Register signal handlers for graceful shutdown."""
+        """Register signal handlers for graceful shutdown on the running loop."""
+        loop = asyncio.get_running_loop()
         for sig in (signal.SIGINT, signal.SIGTERM):
-            signal.signal(sig, self._handle_shutdown)
+            try:
+                loop.add_signal_handler(sig, self._handle_shutdown, sig)
+            except NotImplementedError:
+                # Not supported by the Windows event loops
+                logger.warning(f"Cannot install handler for {sig.name} on this platform")
     
-    def _handle_shutdown(self, signum, frame) -> None:
+    def _handle_shutdown(self, signum: int) -> None:
         """Handle shutdown signals."""
         logger.info(f"Received signal {signum}, shutting down...")
         if self.application:
-            asyncio.create_task(self._shutdown())
+            self._spawn(self._shutdown())
+    
+    def _spawn(self, coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        """Start a background task and track it until it finishes."""
+        task = asyncio.create_task(coro)
+        self._owned_tasks.add(task)
+        task.add_done_callback(self._owned_tasks.discard)
+        return task
     
     async def _shutdown(self) -> None:
         """Gracefully shut down the application."""
         logger.info("Starting graceful shutdown...")
         
-        # Stop all running tasks
-        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        # Stop the tasks we started; library tasks are left to their owners
+        tasks = [t for t in self._owned_tasks if t is not asyncio.current_task()]
         for task in tasks:
             task.cancel()
         
@@ -107,17 +166,21 @@ class TelegramManagerBot:
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
         
-        # Close the application
+        # Let run_polling() stop and shut the application down
         if self.application.running:
-            await self.application.stop()
-            await self.application.shutdown()
+            self.application.stop_running()
         
         logger.info("Shutdown complete")
     
     def setup_handlers(self) -> None:
         """Setup all command and message handlers."""
         # Create application
-        self.application = Application.builder().token(self.bot_token).build()
+        self.application = (
+            Application.builder()
+            .token(self.bot_token)
+            .post_init(self._post_init)
+            .build()
+        )
         
         # Add error handler
         self.application.add_error_handler(self.error_handler)
@@ -162,6 +225,10 @@ class TelegramManagerBot:
             self.handle_message
         ))
     
+    async def _post_init(self, application: Application) -> None:
+        """Finish setup that needs the running event loop."""
+        self._register_signal_handlers()
+    
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         """Handle the /start command."""
         user = update.effective_user
@@ -180,16 +247,6 @@ class TelegramManagerBot:
     
     async def show_main_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Display the main menu."""
-        keyboard = [
-            [InlineKeyboardButton("👤 Account Manager", callback_data="account_menu")],
-            [InlineKeyboardButton("📨 Auto Forwarding", callback_data="forward_menu")],
-            [InlineKeyboardButton("👥 Member Manager", callback_data="member_menu")],
-            [InlineKeyboardButton("📊 Status & Reports", callback_data="status_menu")],
-            [InlineKeyboardButton("⚙️ Settings", callback_data="settings_menu")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         text = (
             "🤖 *Telegram Manager Bot*\n\n"
             "*Features:*\n"
@@ -203,13 +260,13 @@ class TelegramManagerBot:
         if update.callback_query:
             await update.callback_query.edit_message_text(
                 text=text,
-                reply_markup=reply_markup,
+                reply_markup=self._MAIN_MENU_MARKUP,
                 parse_mode='Markdown'
             )
         else:
             await update.message.reply_text(
                 text=text,
-                reply_markup=reply_markup,
+                reply_markup=self._MAIN_MENU_MARKUP,
                 parse_mode='Markdown'
             )
     
@@ -265,16 +322,6 @@ class TelegramManagerBot:
     
     async def show_account_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Display the account management menu."""
-        keyboard = [
-            [InlineKeyboardButton("➕ Add Account", callback_data="add_account")],
-            [InlineKeyboardButton("📋 List Accounts", callback_data="list_accounts")],
-            [InlineKeyboardButton("🔄 Update Account", callback_data="update_account")],
-            [InlineKeyboardButton("❌ Remove Account", callback_data="remove_account")],
-            [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         text = (
             "👤 *Account Manager*\n\n"
             "Manage your Telegram accounts here.\n"
@@ -287,25 +334,13 @@ class TelegramManagerBot:
         
         await update.callback_query.edit_message_text(
             text=text,
-            reply_markup=reply_markup,
+            reply_markup=self._ACCOUNT_MENU_MARKUP,
             parse_mode='Markdown'
         )
     
     async def show_forward_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Display the forwarding management menu."""
-        keyboard = [
-            [InlineKeyboardButton("➕ Add Rule", callback_data="add_rule")],
-            [InlineKeyboardButton("📋 List Rules", callback_data="list_rules")],
-            [InlineKeyboardButton("⚙️ Edit Rule", callback_data="edit_rule")],
-            [InlineKeyboardButton("❌ Remove Rule", callback_data="remove_rule")],
-            [InlineKeyboardButton("▶️ Start All", callback_data="start_all_rules")],
-            [InlineKeyboardButton("⏹️ Stop All", callback_data="stop_all_rules")],
-            [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        active_rules = sum(1 for rule in self.forwarding_manager.rules if rule.get('active', False))
+        active_rules = self.forwarding_manager.active_rule_count
         total_rules = len(self.forwarding_manager.rules)
         
         text = (
@@ -320,22 +355,12 @@ class TelegramManagerBot:
         
         await update.callback_query.edit_message_text(
             text=text,
-            reply_markup=reply_markup,
+            reply_markup=self._FORWARD_MENU_MARKUP,
             parse_mode='Markdown'
         )
     
     async def show_member_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Display the member management menu."""
-        keyboard = [
-            [InlineKeyboardButton("👥 Add Members", callback_data="add_members")],
-            [InlineKeyboardButton("👤 Remove Members", callback_data="remove_members")],
-            [InlineKeyboardButton("📊 Member Stats", callback_data="member_stats")],
-            [InlineKeyboardButton("📋 Export Members", callback_data="export_members")],
-            [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         text = (
             "👥 *Member Manager*\n\n"
             "Manage group members across your accounts.\n"
@@ -348,23 +373,12 @@ class TelegramManagerBot:
         
         await update.callback_query.edit_message_text(
             text=text,
-            reply_markup=reply_markup,
+            reply_markup=self._MEMBER_MENU_MARKUP,
             parse_mode='Markdown'
         )
     
     async def show_settings_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Display the settings menu."""
-        keyboard = [
-            [InlineKeyboardButton("⚙️ Bot Settings", callback_data="bot_settings")],
-            [InlineKeyboardButton("📊 Performance", callback_data="performance_settings")],
-            [InlineKeyboardButton("🔐 Security", callback_data="security_settings")],
-            [InlineKeyboardButton("📝 Logs", callback_data="view_logs")],
-            [InlineKeyboardButton("🔄 Update", callback_data="check_updates")],
-            [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         text = (
             "⚙️ *Settings*\n\n"
             "Configure bot settings and preferences.\n"
@@ -378,7 +392,7 @@ class TelegramManagerBot:
         
         await update.callback_query.edit_message_text(
             text=text,
-            reply_markup=reply_markup,
+            reply_markup=self._SETTINGS_MENU_MARKUP,
             parse_mode='Markdown'
         )
     
@@ -410,9 +424,9 @@ class TelegramManagerBot:
         status_text = (
             "📊 *Bot Status*\n\n"
             f"• *Accounts:* {len(self.account_manager.accounts)}\n"
-            f"• *Active Accounts:* {len([a for a in self.account_manager.accounts if a.get('status') == 'active'])}\n"
+            f"• *Active Accounts:* {len(self.account_manager.active_accounts)}\n"
             f"• *Forwarding Rules:* {len(self.forwarding_manager.rules)}\n"
-            f"• *Active Rules:* {sum(1 for r in self.forwarding_manager.rules if r.get('active', False))}\n\n"
+            f"• *Active Rules:* {self.forwarding_manager.active_rule_count}\n\n"
             "*System Status:*\n"
             f"• Uptime: {self._get_uptime()}\n"
             f"• Version: 2.0.0\n"
@@ -426,13 +440,13 @@ class TelegramManagerBot:
     
     def _get_uptime(self) -> str:
         """Calculate and return bot uptime."""
-        if not hasattr(self, '_start_time'):
-            self._start_time = datetime.now()
+        if not hasattr(self, '_start_monotonic'):
+            self._start_monotonic = time.monotonic()
         
-        uptime = datetime.now() - self._start_time
-        days = uptime.days
-        hours, remainder = divmod(uptime.seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
+        secs = int(time.monotonic() - self._start_monotonic)
+        days, secs = divmod(secs, 86400)
+        hours, secs = divmod(secs, 3600)
+        minutes, seconds = divmod(secs, 60)
         
         return f"{days}d {hours}h {minutes}m {seconds}s"
     
@@ -474,11 +488,12 @@ class TelegramManagerBot:
             return
         
         logger.info("Starting bot...")
-        self._start_time = datetime.now()
+        self._start_monotonic = time.monotonic()
         
         try:
             # Start the Bot
-            self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+            # Signals are handled by _register_signal_handlers
+            self.application.run_polling(allowed_updates=Update.ALL_TYPES, stop_signals=None)
         except Exception as e:
             logger.critical(f"Fatal error: {e}", exc_info=True)
             sys.exit(1)
@@ -490,25 +505,17 @@ class TelegramManagerBot:
 def load_config() -> Dict[str, Any]:
     """Load configuration from file."""
     try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
-        
-        # Set defaults
-        defaults = {
-            'delay_min': 15,
-            'delay_max': 45,
-            'daily_limit': 45,
-            'check_interval': 3600,
-            'max_flood_wait': 300,
-            'retry_attempts': 3,
-            'database_path': 'forwarding.db',
-            'sessions_path': 'sessions',
-            'logs_path': 'logs'
-        }
-        
-        for key, value in defaults.items():
-            if key not in config:
-                config[key] = value
+        with open('config.json', 'rb') as f:
+            config = {**CONFIG_DEFAULTS, **json.load(f)}
+        
+        # Validate required fields and types once, up front
+        missing = [field for field in REQUIRED_CONFIG_FIELDS if field not in config]
+        if missing:
+            raise ValueError(f"Missing required field(s): {', '.join(missing)}")
+        
+        config['authorized_users'] = [int(user_id) for user_id in config['authorized_users']]
+        for key in ('delay_min', 'delay_max', 'daily_limit', 'check_interval', 'max_flood_wait', 'retry_attempts'):
+            config[key] = int(config[key])
         
         return config
         
@@ -518,25 +525,42 @@ def load_config() -> Dict[str, Any]:
     except json.JSONDecodeError:
         print("❌ Error: Invalid JSON in config.json")
         sys.exit(1)
+    except (TypeError, ValueError) as e:
+        print(f"❌ Configuration error: {e}")
+        sys.exit(1)
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Route all logging through a queue drained by a background thread.
+    
+    Returns the started listener; stop it on exit to flush pending records.
+    """
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler('logs/bot.log')
+    stream_handler = logging.StreamHandler()
+    file_handler.setFormatter(formatter)
+    stream_handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+    
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    
+    listener.start()
+    return listener
 
 def main() -> None:
     """Run the bot."""
+    # Ensure directories exist before any log file is opened
+    for directory in ['sessions', 'logs']:
+        os.makedirs(directory, exist_ok=True)
+    
     # Setup logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('logs/bot.log'),
-            logging.StreamHandler()
-        ]
-    )
+    listener = setup_logging()
     
     logger.info("🚀 Starting Telegram Manager Bot...")
     
-    # Ensure directories exist
-    for directory in ['sessions', 'logs']:
-        os.makedirs(directory, exist_ok=True)
-    
     try:
         # Load configuration
         config = load_config()
@@ -549,6 +573,8 @@ def main() -> None:
     except Exception as e:
         logger.critical(f"Fatal error: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        listener.stop()
 
 if __name__ == '__main__':
     main()
@@ -5,12 +5,16 @@ This module handles message forwarding between Telegram chats and member managem
 """
 import asyncio
 import logging
-import json
+import logging.handlers
+import queue
+import random
 import time
-from typing import Dict, List, Optional, Tuple, Union, Any, Set, Callable, Coroutine
+from collections import deque, defaultdict
+from typing import Dict, List, Optional, Tuple, Union, Any, Set, Callable, Coroutine, Deque, DefaultDict
+from dataclasses import dataclass, asdict
 from pathlib import Path
 from datetime import datetime, timedelta
-from telethon import TelegramClient, events, types
+from telethon import TelegramClient, events, types, utils
 from telethon.tl.functions.channels import GetParticipantsRequest, InviteToChannelRequest, DeleteMessagesRequest
 from telethon.tl.functions.messages import AddChatUserRequest, GetDialogsRequest
 from telethon.tl.types import InputPeerChannel, InputPeerUser, ChannelParticipantsSearch, User, Channel, Chat, InputChannel, PeerChannel, PeerChat
@@ -27,10 +31,66 @@ from account_manager import TelegramAccountManager, AccountError, AccountNotFoun
 
 logger = logging.getLogger(__name__)
 
+# Media class -> filter name, looked up by exact type
+_MEDIA_TYPE_MAP = {
+    types.MessageMediaDocument: 'document',
+    types.MessageMediaPhoto: 'photo',
+    types.MessageMediaGeo: 'geo',
+    types.MessageMediaGeoLive: 'geo',
+    types.MessageMediaVenue: 'venue',
+    types.MessageMediaContact: 'contact',
+    types.MessageMediaPoll: 'poll',
+}
+
 class ForwarderError(Exception):
     """Base exception for forwarder-related errors."""
     pass
 
+@dataclass(slots=True)
+class Member:
+    """A scraped chat member."""
+    id: int
+    username: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    phone: Optional[str]
+    is_bot: bool
+    is_verified: bool
+    is_restricted: bool
+    is_scam: bool
+    is_fake: bool
+    status: Optional[str]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the member as a plain dictionary."""
+        return asdict(self)
+
+class Throttle:
+    """Send pacing for one account: the next free send slot and today's send count."""
+    __slots__ = ('next_ok', 'count')
+    
+    def __init__(self):
+        self.next_ok = 0.0
+        self.count = 0
+    
+    async def acquire(self, loop: asyncio.AbstractEventLoop, min_delay: float):
+        """Reserve the account's next send slot and sleep until it arrives.
+        
+        The slot is claimed before sleeping, so concurrent senders on one
+        account queue up ``min_delay`` apart instead of waking together.
+        """
+        now = loop.time()
+        start = max(self.next_ok, now)
+        self.next_ok = start + min_delay
+        if start > now:
+            try:
+                await asyncio.sleep(start - now)
+            except asyncio.CancelledError:
+                # Give the slot back unless a later sender has already queued behind it
+                if self.next_ok == start + min_delay:
+                    self.next_ok = start
+                raise
+
 class ForwarderManager:
     """
     Manages message forwarding between Telegram chats and member management.
@@ -51,29 +111,71 @@ class ForwarderManager:
         self._forwarding_locks: Dict[str, asyncio.Lock] = {}
         self._member_adding_locks: Dict[str, asyncio.Lock] = {}
         self._scraping_locks: Dict[str, asyncio.Lock] = {}
-        self._last_forward_time: Dict[str, float] = {}
-        self._daily_counts: Dict[str, int] = {}
+        # Per-account pacing, keyed by the account manager's int index
+        self._throttles: DefaultDict[int, Throttle] = defaultdict(Throttle)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Usable accounts, rotated for round-robin selection
+        self._available_deque: Deque[Dict[str, Any]] = deque()
         self._last_reset_time = time.time()
+        # (phone, chat) -> (resolved_at, input peer)
+        self._entity_cache: Dict[Tuple[str, Any], Tuple[float, Any]] = {}
+        self._target_sem = asyncio.Semaphore(self.config.get('max_parallel_forwards', 8))
+        # Set to make a rule's task drop its account and pick another
+        self._wake_events: Dict[str, asyncio.Event] = {}
+        self._bound_phones: Dict[str, str] = {}  # rule id -> phone its handler is on
+        # Matched messages wait here for the forward workers
+        self._forward_queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+        self._worker_tasks: List[asyncio.Task] = []
+        # Exception class names whose traceback has already been logged
+        self._seen_excs: Set[str] = set()
         
         # Load forwarding rules from config
         self.forwarding_rules: List[Dict[str, Any]] = self.config.get('forwarding_rules', [])
+        self._rules_by_id: Dict[str, Dict[str, Any]] = {r['id']: r for r in self.forwarding_rules if r.get('id')}
+        
+        # Rate limits per rule as (min_delay, max_daily), resolved against the global defaults once
+        self._default_min_delay = float(self.config.get('min_delay', 1))
+        self._default_max_daily = int(self.config.get('max_daily', 100))
+        self._default_limits = (self._default_min_delay, self._default_max_daily)
+        self._limits_by_id: Dict[str, Tuple[float, int]] = {
+            rule_id: (
+                float(rule.get('min_delay', self._default_min_delay)),
+                int(rule.get('max_daily', self._default_max_daily))
+            )
+            for rule_id, rule in self._rules_by_id.items()
+        }
         
         # Setup periodic tasks
         self._periodic_tasks: List[asyncio.Task] = []
         
         # Setup logging
+        self._log_handler: Optional[logging.handlers.QueueHandler] = None
+        self._log_listener: Optional[logging.handlers.QueueListener] = None
         self._setup_logging()
     
     def _setup_logging(self):
-        """Configure logging for the forwarder manager."""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('forwarder.log'),
-                logging.StreamHandler()
-            ]
-        )
+        """Configure logging for the forwarder manager.
+        
+        Records go through a queue to a background thread, so log calls on the
+        forwarding path never block the event loop on disk writes. Does nothing
+        if the application has already configured logging.
+        """
+        root = logging.getLogger()
+        if root.handlers:
+            return
+        
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler = logging.FileHandler('forwarder.log')
+        stream_handler = logging.StreamHandler()
+        file_handler.setFormatter(formatter)
+        stream_handler.setFormatter(formatter)
+        
+        log_queue = queue.SimpleQueue()
+        self._log_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+        self._log_handler = logging.handlers.QueueHandler(log_queue)
+        root.setLevel(logging.INFO)
+        root.addHandler(self._log_handler)
+        self._log_listener.start()
     
     async def start(self):
         """Start the forwarder manager and all forwarding tasks."""
@@ -83,6 +185,7 @@ class ForwarderManager:
         
         logger.info("🚀 Starting Forwarder Manager...")
         self.running = True
+        self._loop = asyncio.get_running_loop()
         
         # Start periodic tasks
         self._periodic_tasks = [
@@ -90,8 +193,15 @@ class ForwarderManager:
             asyncio.create_task(self._periodic_check_connections())
         ]
         
+        # Start the workers that drain the forward queue
+        self._worker_tasks = [
+            asyncio.create_task(self._forward_worker(i))
+            for i in range(self.config.get('forward_workers', 8))
+        ]
+        
         # Start forwarding for all rules
         for rule in self.forwarding_rules:
+            rule['_filter_fn'] = self._compile_filters(rule.get('filters', {}))
             asyncio.create_task(self._start_forwarding(rule))
         
         logger.info("✅ Forwarder Manager started successfully")
@@ -109,17 +219,27 @@ class ForwarderManager:
         for task in self._periodic_tasks:
             task.cancel()
         
-        # Cancel all forwarding tasks
+        # Cancel all forwarding tasks and workers
         for task in self.forwarding_tasks.values():
             task.cancel()
+        for task in self._worker_tasks:
+            task.cancel()
         
-        # Wait for all tasks to complete
-        await asyncio.gather(
-            *self._periodic_tasks + list(self.forwarding_tasks.values()),
-            return_exceptions=True
-        )
+        # Wait for the cancellations to land, but don't let one stuck task hold up shutdown
+        tasks = [*self._periodic_tasks, *self.forwarding_tasks.values(), *self._worker_tasks]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=10)
+            if pending:
+                logger.warning(f"{len(pending)} forwarding task(s) did not stop within 10 seconds")
         
         logger.info("✅ Forwarder Manager stopped successfully")
+        
+        # Flush and detach the logging queue we installed
+        if self._log_listener:
+            logging.getLogger().removeHandler(self._log_handler)
+            self._log_listener.stop()
+            self._log_listener = None
+            self._log_handler = None
         return True
     
     async def _periodic_reset_daily_counts(self):
@@ -127,7 +247,8 @@ class ForwarderManager:
         while self.running:
             try:
                 await asyncio.sleep(86400)  # 24 hours
-                self._daily_counts.clear()
+                for throttle in self._throttles.values():
+                    throttle.count = 0
                 self._last_reset_time = time.time()
                 logger.info("♻️ Reset daily message and member add counts")
             except asyncio.CancelledError:
@@ -141,11 +262,19 @@ class ForwarderManager:
         while self.running:
             try:
                 await asyncio.sleep(300)  # 5 minutes
-                accounts = self.account_manager.get_all_accounts_status()
+                self._available_deque = deque(await self._get_available_accounts())
+                accounts = await self.account_manager.get_all_accounts_status()
+                disconnected = set()
                 for account in accounts:
                     if not account.get('is_connected', False):
-                        logger.warning(f"Account {account.get('phone')} is disconnected. Attempting to reconnect...")
-                        await self.account_manager.reconnect_account(account['phone'])
+                        logger.warning(f"Account {account.get('phone')} is disconnected. Queueing reconnect...")
+                        self.account_manager.request_reconnect(account['phone'])
+                        disconnected.add(account['phone'])
+                
+                # Move rules off disconnected accounts
+                for rule_id, phone in self._bound_phones.items():
+                    if phone in disconnected:
+                        self._wake_events[rule_id].set()
             except asyncio.CancelledError:
                 raise
             except Exception as e:
@@ -175,11 +304,11 @@ class ForwarderManager:
             self._forwarding_locks[rule_id] = asyncio.Lock()
         
         # Create and store the forwarding task
-        self.forwarding_tasks[rule_id] = asyncio.create_task(self._forward_messages(rule))
+        self.forwarding_tasks[rule_id] = asyncio.create_task(self._ingest_loop(rule))
     
-    async def _forward_messages(self, rule: Dict[str, Any]):
+    async def _ingest_loop(self, rule: Dict[str, Any]):
         """
-        Forward messages according to the given rule.
+        Queue messages matching the given rule for the forward workers.
         
         Args:
             rule: Dictionary containing forwarding rule configuration
@@ -187,7 +316,7 @@ class ForwarderManager:
         rule_id = rule.get('id')
         source_chats = rule.get('source_chats', [])
         target_chats = rule.get('target_chats', [])
-        filters = rule.get('filters', {})
+        matches = rule.get('_filter_fn') or self._compile_filters(rule.get('filters', {}))
         
         if not source_chats or not target_chats:
             logger.error(f"Rule {rule_id}: No source or target chats specified")
@@ -195,6 +324,7 @@ class ForwarderManager:
         
         logger.info(f"📡 Setting up forwarding for rule {rule_id}: {len(source_chats)} sources -> {len(target_chats)} targets")
         
+        wake = self._wake_events.setdefault(rule_id, asyncio.Event())
         while self.running:
             try:
                 # Get an available account for this rule
@@ -213,202 +343,245 @@ class ForwarderManager:
                         continue
                 
                 # Setup event handlers for this account
-                client = self.account_manager._clients.get(account['phone'])
+                client = account.get('client')
                 if not client:
                     logger.error(f"No client found for account {account['phone']}")
                     await asyncio.sleep(60)
                     continue
                 
-                # Process each source chat
+                # Resolve the source chats once for the handler's chat filter
+                sources = []
                 for source in source_chats:
                     try:
-                        await self._process_source_chat(account, client, source, target_chats, filters, rule_id)
-                    except Exception as e:
-                        logger.error(f"Error processing source chat {source}: {e}", exc_info=True)
+                        sources.append(await self._resolve(client, account['phone'], source))
+                    except ValueError:
+                        logger.error(f"Could not find source chat: {source}")
+                if not sources:
+                    logger.error(f"Rule {rule_id}: none of the source chats could be resolved")
+                    return
                 
-                # Small delay between processing different sources
-                await asyncio.sleep(5)
+                # Resolve the targets up front so forwards don't look them up per message
+                targets = []
+                for target in target_chats:
+                    try:
+                        targets.append((target, await self._resolve(client, account['phone'], target)))
+                    except (ValueError, ChannelPrivateError, ChannelInvalidError) as e:
+                        logger.error(f"Could not resolve target chat {target}: {e}")
+                if not targets:
+                    logger.error(f"Rule {rule_id}: none of the target chats could be resolved")
+                    return
+                
+                # New messages are pushed to the handler; this task just holds the
+                # registration until it is woken to move to another account
+                handler = self._make_handler(account, client, rule_id, targets, matches)
+                client.add_event_handler(handler, events.NewMessage(chats=sources))
+                self._bound_phones[rule_id] = account['phone']
+                try:
+                    await wake.wait()
+                    wake.clear()
+                    logger.info(f"Rule {rule_id}: moving off account {account['phone']}")
+                finally:
+                    client.remove_event_handler(handler)
+                    self._bound_phones.pop(rule_id, None)
                 
             except asyncio.CancelledError:
                 logger.info(f"Forwarding task for rule {rule_id} was cancelled")
                 raise
             except Exception as e:
-                logger.error(f"Error in forwarding task {rule_id}: {e}", exc_info=True)
+                self._log_exc(f"Error in forwarding task {rule_id}", e)
                 await asyncio.sleep(60)  # Wait before retrying
     
-    async def _process_source_chat(self, account: Dict[str, Any], client: TelegramClient, 
-                                 source: Union[str, int], target_chats: List[Union[str, int]], 
-                                 filters: Dict[str, Any], rule_id: str):
-        """Process messages from a source chat and forward them to target chats."""
-        try:
-            # Get the source chat entity
+    def _make_handler(self, account: Dict[str, Any], client: TelegramClient, rule_id: str,
+                      targets: List[Tuple[Union[str, int], Any]], matches: Callable[[types.Message], bool]):
+        """Build the NewMessage handler that queues matching messages for forwarding."""
+        async def handler(event):
+            message = event.message
+            if matches(message):
+                await self._forward_queue.put((account, client, message, targets, rule_id))
+        
+        return handler
+    
+    async def _forward_worker(self, worker_id: int):
+        """Take queued messages and forward each to all of its target chats."""
+        while True:
+            account, client, message, targets, rule_id = await self._forward_queue.get()
             try:
-                source_entity = await client.get_entity(source)
-                source_id = getattr(source_entity, 'id', None)
-                if not source_id:
-                    logger.error(f"Could not get ID for source: {source}")
-                    return
-                
-                # Get recent messages
-                messages = await client.get_messages(source_entity, limit=10)
-                
-                # Process each message
-                for message in messages:
-                    if not message:
-                        continue
-                    
-                    # Apply filters
-                    if not self._message_matches_filters(message, filters):
-                        continue
-                    
-                    # Forward to each target chat
-                    for target in target_chats:
-                        try:
-                            await self._forward_message(account, client, message, target, rule_id)
-                            await asyncio.sleep(1)  # Small delay between forwards
-                        except Exception as e:
-                            logger.error(f"Error forwarding message to {target}: {e}", exc_info=True)
-            except ValueError as e:
-                if "Could not find the entity" in str(e):
-                    logger.error(f"Could not find source chat: {source}")
-                else:
-                    raise
-        except Exception as e:
-            logger.error(f"Error processing source chat {source}: {e}", exc_info=True)
+                # Forward to all target chats concurrently
+                results = await asyncio.gather(
+                    *(self._forward_message(account, client, message, target, peer, rule_id) for target, peer in targets),
+                    return_exceptions=True
+                )
+                for (target, _), result in zip(targets, results):
+                    if isinstance(result, Exception):
+                        logger.error(f"Error forwarding message to {target}: {result}")
+            except Exception as e:
+                self._log_exc(f"Forward worker {worker_id} failed on rule {rule_id}", e)
+            finally:
+                self._forward_queue.task_done()
     
     async def _forward_message(self, account: Dict[str, Any], client: TelegramClient, 
-                            message: types.Message, target: Union[str, int], rule_id: str):
-        """Forward a single message to the target chat."""
+                            message: types.Message, target: Union[str, int], peer: Any, rule_id: str):
+        """Forward a single message to the target chat, waiting out flood limits.
+        
+        ``peer`` is the target resolved when the rule started; pass None to
+        resolve it here.
+        """
+        max_retries = self.config.get('flood_wait_retries', 5)
+        throttle = self._throttles[account['idx']]
+        
+        # Claim today's slot up front so concurrent forwards can't overshoot the cap
+        min_delay = self._check_rate_limits(account, rule_id)
         try:
-            # Get the target entity
-            target_entity = await client.get_entity(target)
-            
-            # Check rate limits
-            await self._check_rate_limits(account['phone'], rule_id)
-            
-            # Forward the message
-            await client.forward_messages(target_entity, message)
-            
-            # Update last forward time and count
-            self._last_forward_time[account['phone']] = time.time()
-            self._daily_counts[account['phone']] = self._daily_counts.get(account['phone'], 0) + 1
-            
-            logger.info(f"✅ Forwarded message from {message.chat_id} to {getattr(target_entity, 'title', target_entity.id)}")
+            for attempt in range(1, max_retries + 1):
+                # Wait for the account's send slot before taking a forwarding slot,
+                # so pacing one account doesn't hold up the others
+                await throttle.acquire(self._loop, min_delay)
+                
+                async with self._target_sem:
+                    try:
+                        # Get the target entity
+                        target_entity = peer if peer is not None else await self._resolve(client, account['phone'], target)
+                        
+                        # Forward the message
+                        await client.forward_messages(target_entity, message)
+                        
+                        logger.info(f"✅ Forwarded message from {message.chat_id} to {target}")
+                        return
+                        
+                    except (ChannelInvalidError, ChatIdInvalidError):
+                        self._entity_cache.pop((account['phone'], target), None)
+                        if peer is None:
+                            raise
+                        # The peer resolved at startup went stale; resolve it afresh on the next attempt
+                        peer = None
+                        continue
+                    except FloodWaitError as e:
+                        logger.warning(f"Flood wait for {e.seconds} seconds (attempt {attempt}/{max_retries}). Waiting...")
+                        flood_wait = e.seconds
+                    except Exception as e:
+                        self._log_exc("Error forwarding message", e)
+                        raise
+                
+                # Wait outside the semaphore so other targets keep moving; jitter
+                # keeps retries from several workers from landing together
+                await asyncio.sleep(flood_wait + random.uniform(0, 1))
             
-        except FloodWaitError as e:
-            logger.warning(f"Flood wait for {e.seconds} seconds. Waiting...")
-            await asyncio.sleep(e.seconds)
-            # Retry the forward
-            await self._forward_message(account, client, message, target, rule_id)
-        except Exception as e:
-            logger.error(f"Error forwarding message: {e}", exc_info=True)
+            raise ForwarderError(f"Gave up forwarding to {target} after {max_retries} flood waits")
+        except BaseException:
+            # The message never went out; hand its daily slot back
+            throttle.count -= 1
             raise
     
+    def _log_exc(self, msg: str, e: Exception):
+        """Log an error, with the traceback only the first time its class is seen."""
+        key = type(e).__name__
+        if key not in self._seen_excs:
+            self._seen_excs.add(key)
+            logger.error(f"{msg}: {e}", exc_info=True)
+        else:
+            logger.error(f"{msg}: {e}")
+    
+    async def _resolve(self, client: TelegramClient, phone: str, key: Union[str, int], ttl: float = 3600):
+        """Resolve a chat to an input peer, reusing the result for ``ttl`` seconds."""
+        cached = self._entity_cache.get((phone, key))
+        if cached and time.time() - cached[0] < ttl:
+            return cached[1]
+        
+        entity = await client.get_input_entity(key)
+        self._entity_cache[(phone, key)] = (time.time(), entity)
+        return entity
+    
     async def _get_available_account(self, rule_id: str) -> Optional[Dict[str, Any]]:
         """Get an available account for the given rule."""
-        accounts = self.account_manager.get_all_accounts_status()
-        
-        # Filter available accounts
-        available_accounts = [
-            acc for acc in accounts 
-            if acc.get('is_connected', False) and 
-            acc.get('status') == 'active' and 
-            not acc.get('is_limited', False)
-        ]
-        
-        if not available_accounts:
-            return None
+        if not self._available_deque:
+            self._available_deque = deque(await self._get_available_accounts())
+            if not self._available_deque:
+                return None
         
         # Simple round-robin selection
-        if rule_id not in self._last_used_accounts:
-            self._last_used_accounts[rule_id] = 0
-        
-        idx = self._last_used_accounts[rule_id] % len(available_accounts)
-        self._last_used_accounts[rule_id] = idx + 1
+        account = self._available_deque[0]
+        self._available_deque.rotate(-1)
+        return account
+    
+    async def _get_available_accounts(self) -> List[Dict[str, Any]]:
+        """Get all connected, active and unlimited accounts.
         
-        return available_accounts[idx]
+        These are the account manager's own account dicts, so each carries its
+        connected client under ``'client'``.
+        """
+        return [
+            acc for acc in self.account_manager.active_accounts.values()
+            if acc.get('is_connected', False)
+        ]
     
-    def _message_matches_filters(self, message: types.Message, filters: Dict[str, Any]) -> bool:
-        """Check if a message matches the given filters."""
+    def _compile_filters(self, filters: Dict[str, Any]) -> Callable[[types.Message], bool]:
+        """Build a predicate for the given filters, checking only the ones that are set."""
         if not filters:
-            return True
-        
-        # Text filter
-        if 'text' in filters and message.text:
-            text_filter = filters['text'].lower()
-            if text_filter not in message.text.lower():
-                return False
-        
-        # Sender filter
-        if 'senders' in filters and message.sender_id:
-            sender_id = str(message.sender_id)
-            if sender_id not in filters['senders']:
-                return False
-        
-        # Media type filter
-        if 'media_types' in filters:
-            media_type = self._get_media_type(message)
-            if media_type and media_type not in filters['media_types']:
+            return lambda message: True
+        
+        text_lc = filters['text'].lower() if 'text' in filters else None
+        senders = None
+        if 'senders' in filters:
+            # Compare ids as ints; entries that aren't numeric ids could never match
+            numeric = [x for x in filters['senders'] if str(x).lstrip('-').isdigit()]
+            if len(numeric) < len(filters['senders']):
+                logger.warning("Ignoring non-numeric entries in the senders filter")
+            senders = frozenset(int(x) for x in numeric)
+        media_types = frozenset(filters['media_types']) if 'media_types' in filters else None
+        date_range = filters.get('date_range')
+        start_date = date_range.get('start') if date_range else None
+        end_date = date_range.get('end') if date_range else None
+        get_media_type = self._get_media_type
+        
+        def matches(message: types.Message) -> bool:
+            # Text filter
+            if text_lc is not None and message.text and text_lc not in message.text.lower():
                 return False
-        
-        # Date range filter
-        if 'date_range' in filters:
-            msg_date = message.date.replace(tzinfo=None)
-            start_date = filters['date_range'].get('start')
-            end_date = filters['date_range'].get('end')
             
-            if start_date and msg_date < start_date:
-                return False
-            if end_date and msg_date > end_date:
+            # Sender filter
+            if senders is not None and message.sender_id and message.sender_id not in senders:
                 return False
+            
+            # Media type filter
+            if media_types is not None:
+                media_type = get_media_type(message)
+                if media_type and media_type not in media_types:
+                    return False
+            
+            # Date range filter
+            if start_date or end_date:
+                msg_date = message.date.replace(tzinfo=None)
+                if start_date and msg_date < start_date:
+                    return False
+                if end_date and msg_date > end_date:
+                    return False
+            
+            return True
         
-        return True
+        return matches
     
     def _get_media_type(self, message: types.Message) -> Optional[str]:
         """Get the media type of a message."""
-        if not message.media:
-            return None
-            
-        if hasattr(message.media, 'document'):
-            return 'document'
-        elif hasattr(message.media, 'photo'):
-            return 'photo'
-        elif hasattr(message.media, 'audio'):
-            return 'audio'
-        elif hasattr(message.media, 'video'):
-            return 'video'
-        elif hasattr(message.media, 'voice'):
-            return 'voice'
-        elif hasattr(message.media, 'sticker'):
-            return 'sticker'
-        elif hasattr(message.media, 'gif'):
-            return 'gif'
-        
-        return 'unknown'
+        media = message.media
+        return _MEDIA_TYPE_MAP.get(type(media), 'unknown') if media else None
     
-    async def _check_rate_limits(self, phone: str, rule_id: str):
-        """Check and enforce rate limits for the given account and rule."""
-        # Get rule-specific rate limits
-        rule = next((r for r in self.forwarding_rules if r.get('id') == rule_id), {})
-        
-        # Get rate limits from rule or use defaults
-        min_delay = rule.get('min_delay', self.config.get('min_delay', 1))
-        max_daily = rule.get('max_daily', self.config.get('max_daily', 100))
-        
-        # Check daily limit
-        daily_count = self._daily_counts.get(phone, 0)
-        if daily_count >= max_daily:
-            raise Exception(f"Daily limit of {max_daily} messages reached for account {phone}")
-        
-        # Enforce minimum delay between messages
-        last_time = self._last_forward_time.get(phone, 0)
-        elapsed = time.time() - last_time
-        if elapsed < min_delay:
-            await asyncio.sleep(min_delay - elapsed)
+    def _check_rate_limits(self, account: Dict[str, Any], rule_id: str) -> float:
+        """Count a send against the account's daily limit and return the rule's minimum delay."""
+        throttle = self._throttles[account['idx']]
+        
+        # Get rule-specific rate limits or the defaults
+        min_delay, max_daily = self._limits_by_id.get(rule_id, self._default_limits)
+        
+        # Check daily limit and reserve the send in the same step
+        if throttle.count >= max_daily:
+            raise Exception(f"Daily limit of {max_daily} messages reached for account {account['phone']}")
+        throttle.count += 1
+        
+        return min_delay
     
     # Member Management Methods
     
-    async def scrape_members(self, chat_id: Union[str, int], limit: int = 200) -> List[Dict[str, Any]]:
+    async def scrape_members(self, chat_id: Union[str, int], limit: int = 200) -> List[Member]:
         """
         Scrape members from a chat or channel.
         
@@ -417,13 +590,13 @@ class ForwarderManager:
             limit: Maximum number of members to scrape
             
         Returns:
-            List of member information dictionaries
+            List of scraped members
         """
         account = await self._get_available_account('scrape')
         if not account:
             raise ForwarderError("No available accounts for scraping")
         
-        client = self.account_manager._clients.get(account['phone'])
+        client = account.get('client')
         if not client:
             raise ForwarderError(f"No client found for account {account['phone']}")
         
@@ -431,46 +604,24 @@ class ForwarderManager:
             # Get the chat entity
             chat = await client.get_entity(chat_id)
             
-            # Get participants
+            # Get participants; Telethon pages the requests and sleeps through flood waits
             participants = []
-            offset = 0
-            batch_size = min(limit, 200)  # Telegram API limit
-            
-            while len(participants) < limit:
-                result = await client(GetParticipantsRequest(
-                    channel=chat,
-                    filter=ChannelParticipantsSearch(''),
-                    offset=offset,
-                    limit=batch_size,
-                    hash=0
+            async for user in client.iter_participants(chat, limit=limit):
+                participants.append(Member(
+                    id=user.id,
+                    username=user.username,
+                    first_name=user.first_name,
+                    last_name=user.last_name,
+                    phone=user.phone,
+                    is_bot=user.bot,
+                    is_verified=user.verified,
+                    is_restricted=user.restricted,
+                    is_scam=user.scam,
+                    is_fake=user.fake,
+                    status=str(user.status) if hasattr(user, 'status') else None
                 ))
-                
-                if not result.users:
-                    break
-                
-                for user in result.users:
-                    participants.append({
-                        'id': user.id,
-                        'username': user.username,
-                        'first_name': user.first_name,
-                        'last_name': user.last_name,
-                        'phone': user.phone,
-                        'is_bot': user.bot,
-                        'is_verified': user.verified,
-                        'is_restricted': user.restricted,
-                        'is_scam': user.scam,
-                        'is_fake': user.fake,
-                        'status': str(user.status) if hasattr(user, 'status') else None
-                    })
-                
-                offset += len(result.users)
-                if len(result.users) < batch_size:
-                    break
-                
-                # Small delay to avoid rate limits
-                await asyncio.sleep(1)
             
-            return participants[:limit]
+            return participants
             
         except Exception as e:
             logger.error(f"Error scraping members: {e}", exc_info=True)
@@ -492,27 +643,34 @@ class ForwarderManager:
         Returns:
             Dictionary with results and statistics
         """
-        account = await self._get_available_account('add_members')
-        if not account:
+        accounts = await self._get_available_accounts()
+        clients = [
+            (acc['phone'], acc.get('client'))
+            for acc in accounts
+        ]
+        clients = [(phone, client) for phone, client in clients if client]
+        if not clients:
             raise ForwarderError("No available accounts for adding members")
         
-        client = self.account_manager._clients.get(account['phone'])
-        if not client:
-            raise ForwarderError(f"No client found for account {account['phone']}")
-        
         results = {
             'total': len(user_ids),
             'success': 0,
             'failed': 0,
             'errors': {}
         }
-        
-        try:
+        # Tallied in locals and written to results once the workers finish
+        success = 0
+        failed = 0
+        errors: Dict[Union[int, str], str] = {}
+        
+        async def worker(phone: str, client: TelegramClient, shard: List[Union[int, str]]):
+            """Add one shard of users through one account, at that account's own pace."""
+            nonlocal success, failed
             # Get the target chat entity
             target_chat = await client.get_entity(target_chat_id)
             
             # Add each user
-            for user_id in user_ids:
+            for user_id in shard:
                 try:
                     # Get user entity
                     user = await client.get_entity(user_id)
@@ -524,8 +682,8 @@ class ForwarderManager:
                         target_chat=target_chat.id
                     ))
                     
-                    results['success'] += 1
-                    logger.info(f"✅ Added user {user_id} to chat {target_chat_id}")
+                    success += 1
+                    logger.info(f"✅ Added user {user_id} to chat {target_chat_id} via {phone}")
                     
                     # Delay between adds to avoid rate limits
                     await asyncio.sleep(delay)
@@ -533,40 +691,51 @@ class ForwarderManager:
                 except UserNotParticipantError:
                     error_msg = f"User {user_id} is not a member of the source chat"
                     logger.warning(error_msg)
-                    results['errors'][str(user_id)] = error_msg
-                    results['failed'] += 1
+                    errors[user_id] = error_msg
+                    failed += 1
                     
                 except UserPrivacyRestrictedError:
                     error_msg = f"User {user_id} has privacy restrictions"
                     logger.warning(error_msg)
-                    results['errors'][str(user_id)] = error_msg
-                    results['failed'] += 1
+                    errors[user_id] = error_msg
+                    failed += 1
                     
                 except UserAlreadyParticipantError:
                     error_msg = f"User {user_id} is already in the target chat"
                     logger.warning(error_msg)
-                    results['errors'][str(user_id)] = error_msg
-                    results['failed'] += 1
+                    errors[user_id] = error_msg
+                    failed += 1
                     
                 except FloodWaitError as e:
                     error_msg = f"Flood wait for {e.seconds} seconds"
-                    logger.warning(f"{error_msg}. Waiting...")
-                    results['errors'][str(user_id)] = error_msg
-                    results['failed'] += 1
+                    logger.warning(f"{error_msg} on {phone}. Waiting...")
+                    errors[user_id] = error_msg
+                    failed += 1
                     await asyncio.sleep(e.seconds)
-                    # Retry this user after waiting
                     continue
                     
                 except Exception as e:
                     error_msg = str(e)
                     logger.error(f"Error adding user {user_id}: {error_msg}", exc_info=True)
-                    results['errors'][str(user_id)] = error_msg
-                    results['failed'] += 1
+                    errors[user_id] = error_msg
+                    failed += 1
                     
                     # If it's a critical error, stop the operation
                     if isinstance(e, (ChatAdminRequiredError, ChannelPrivateError, 
                                     ChatWriteForbiddenError, ChannelInvalidError)):
                         raise
+        
+        try:
+            # Shard users round-robin so each account works through its own list
+            shards = [user_ids[i::len(clients)] for i in range(len(clients))]
+            outcomes = await asyncio.gather(
+                *(worker(phone, client, shard) for (phone, client), shard in zip(clients, shards) if shard),
+                return_exceptions=True
+            )
+            results.update(success=success, failed=failed, errors=errors)
+            for outcome in outcomes:
+                if isinstance(outcome, Exception):
+                    raise outcome
             
             return results
             
@@ -588,7 +757,7 @@ class ForwarderManager:
         if not account:
             raise ForwarderError("No available accounts for getting chat info")
         
-        client = self.account_manager._clients.get(account['phone'])
+        client = account.get('client')
         if not client:
             raise ForwarderError(f"No client found for account {account['phone']}")
         
@@ -645,7 +814,7 @@ class ForwarderManager:
         if not account:
             raise ForwarderError("No available accounts for sending messages")
         
-        client = self.account_manager._clients.get(account['phone'])
+        client = account.get('client')
         if not client:
             raise ForwarderError(f"No client found for account {account['phone']}")
         
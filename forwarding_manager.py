@@ -1,17 +1,124 @@
 import sqlite3
-import json
 import logging
 import asyncio
+import functools
+import re
+import time
 import traceback
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from telethon import events, errors
+from telethon import events, errors, utils
 from telethon.tl.types import Channel, Chat
 
+DB_PATH = 'forwarding.db'
+
+# WAL lets readers run alongside the log writes and makes NORMAL sync safe
+DB_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "busy_timeout=5000",
+    "temp_store=MEMORY",
+    "cache_size=-20000",
+    "mmap_size=268435456",
+)
+
+# Columns added since the first schema; databases created before them get
+# them through ALTER TABLE in setup_database
+SCHEMA_MIGRATIONS = (
+    ('forwarded_messages', 'rule_id', 'INTEGER'),
+    ('forwarded_messages', 'message_text', 'TEXT'),
+    ('forwarding_rules', 'messages_forwarded', 'INTEGER DEFAULT 0'),
+)
+
+# Buffered log rows are written at least this often, or as soon as this many are waiting
+LOG_FLUSH_INTERVAL = 0.5
+LOG_FLUSH_ROWS = 200
+
+# Statements run on every forwarded message or status change, kept as
+# constants so the connection's statement cache always gets the same text
+INSERT_FORWARD_SQL = '''
+    INSERT INTO forwarded_messages 
+    (rule_id, account_phone, source_chat_id, source_message_id, 
+     destination_chat_id, destination_message_id, message_text)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+INSERT_ERROR_SQL = '''
+    INSERT INTO forwarding_errors 
+    (rule_id, account_phone, error_type, error_message)
+    VALUES (?, ?, ?, ?)
+'''
+UPDATE_STATUS_SQL = 'UPDATE forwarding_rules SET status = ? WHERE id = ?'
+UPDATE_COUNTERS_SQL = '''
+    UPDATE forwarding_rules 
+    SET messages_forwarded = messages_forwarded + ?,
+        last_message_id = MAX(last_message_id, ?)
+    WHERE id = ?
+'''
+
+# Columns returned for each rule by get_forwarding_rules
+RULE_COLUMNS = (
+    'id', 'account_phone', 'source_chat_id', 'source_chat_name', 'destination_chat_ids',
+    'keywords', 'status', 'created_at', 'last_message_id', 'messages_forwarded',
+)
+SELECT_RULES_SQL = f"SELECT {', '.join(RULE_COLUMNS)} FROM forwarding_rules"
+
+# Fixed statistics queries for each branch, so each always hits the statement cache
+STATS_SQL = '''
+    SELECT COUNT(*) as total_forwarded,
+           COUNT(DISTINCT destination_chat_id) as unique_destinations,
+           MIN(forwarded_at) as first_forward,
+           MAX(forwarded_at) as last_forward,
+           (SELECT COUNT(*) FROM forwarding_errors) as total_errors
+    FROM forwarded_messages
+'''
+STATS_BY_RULE_SQL = '''
+    SELECT COUNT(*) as total_forwarded,
+           COUNT(DISTINCT destination_chat_id) as unique_destinations,
+           MIN(forwarded_at) as first_forward,
+           MAX(forwarded_at) as last_forward,
+           (SELECT COUNT(*) FROM forwarding_errors WHERE rule_id = ?) as total_errors
+    FROM forwarded_messages
+    WHERE rule_id = ?
+'''
+
+# What get_forwarding_statistics returns when there is nothing to read
+EMPTY_STATISTICS = {
+    'total_forwarded': 0,
+    'unique_destinations': 0,
+    'first_forward': None,
+    'last_forward': None,
+    'total_errors': 0
+}
+
+# Seconds between the sends when one message goes to several destinations
+FORWARD_STAGGER = 0.2
+
+# Forwards one account may have in flight at once, across all its rules
+ACCOUNT_FORWARD_SLOTS = 20
+
+# Seconds a get_forwarding_rules result is reused; rule changes made here
+# invalidate it at once, only the per-message counters can lag this long
+RULES_CACHE_TTL = 2.0
+
+# How many rules start_forwarding_rules starts at once
+START_CONCURRENCY = 8
+
+@functools.lru_cache(maxsize=1024)
+def _parse_json_list(text):
+    """Parse a rule's JSON list column once per distinct value"""
+    return tuple(orjson.loads(text))
+
 class TelegramForwardingManager:
     def __init__(self, account_manager):
         self.account_manager = account_manager
         self.forwarding_sessions = {}
+        self._session_key_by_rule = {}  # rule_id -> key in forwarding_sessions
         self.forwarding_rules = {}
+        self.active_rule_count = 0  # kept in step with forwarding_sessions
+        self._rule_count = None  # rows in forwarding_rules, None until loaded
+        self._rules_version = 0  # bumped whenever a rule is added, removed or changes status
+        self._rules_cache = {}  # account_phone -> (version, time, rules)
         self._initialized = False
         
         # Initialize logger FIRST before anything else
@@ -23,22 +130,108 @@ class TelegramForwardingManager:
             self.logger.addHandler(handler)
             self.logger.setLevel(logging.INFO)
         
-        # Setup database connection
-        self.db_connection = None
+        # Setup database connections: one for writes, one for reads, so
+        # status lookups don't queue behind log writes under WAL
+        self._write_conn = None
+        self._read_conn = None
+        self._read_cursor = None  # reused for every query; only the reader thread touches it
+        # sqlite3 blocks, so each connection is opened on and only used from
+        # its own worker thread and the event loop just awaits the result
+        self._write_executor = None
+        self._read_executor = None
+        
+        # Forward and error log rows waiting for the next batched write
+        self._pending_logs = []
+        self._pending_errors = []
+        self._logs_full = asyncio.Event()
+        self._log_flusher_task = None
+        
+        # One NewMessage handler per client, routing by chat id to the
+        # sessions watching that chat
+        self._client_routes = {}  # client -> {chat_id: set(session_key)}
+        self._client_dispatchers = {}  # client -> registered handler
+        self._account_slots = {}  # phone -> Semaphore(ACCOUNT_FORWARD_SLOTS)
         
     async def initialize(self):
         """Initialize the forwarding manager asynchronously"""
         if not self._initialized:
             # Setup database
-            self.db_connection = sqlite3.connect('forwarding.db', check_same_thread=False)
-            self.setup_database()
+            self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fwd-db-write')
+            self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fwd-db-read')
+            self._write_conn = await self._write(self._open_connection)
+            self._read_conn = await self._read(self._open_connection)
+            self._read_cursor = await self._read(self._read_conn.cursor)
+            await self._write(self.setup_database)
+            self._rule_count = (await self._read(self._fetchone, 'SELECT COUNT(*) FROM forwarding_rules'))[0]
+            self._log_flusher_task = asyncio.create_task(self._log_flusher())
             self._initialized = True
+    
+    async def close(self):
+        """Write out buffered logs and close the database"""
+        if self._log_flusher_task:
+            self._log_flusher_task.cancel()
+            self._log_flusher_task = None
+        await self.flush_logs()
+        if self._read_conn:
+            await self._read(self._read_conn.close)
+        if self._write_conn:
+            await self._write(self._write_conn.close)
+        self._write_conn = None
+        self._read_conn = None
+        self._read_cursor = None
+        # The closes above were the last jobs and have finished, so don't
+        # block the loop joining the threads
+        for executor in (self._read_executor, self._write_executor):
+            if executor:
+                executor.shutdown(wait=False)
+        self._write_executor = None
+        self._read_executor = None
+        self._initialized = False
+    
+    async def _write(self, func, *args):
+        """Run a blocking call against the writer connection off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._write_executor, func, *args)
+    
+    async def _read(self, func, *args):
+        """Run a blocking call against the reader connection off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, func, *args)
+    
+    def _fetchone(self, query, params=()):
+        return self._read_cursor.execute(query, params).fetchone()
+    
+    def _fetchall(self, query, params=()):
+        return self._read_cursor.execute(query, params).fetchall()
+    
+    @property
+    def db_connection(self):
+        """The writer connection, under its old name"""
+        return self._write_conn
+    
+    def _open_connection(self):
+        """Open an autocommit connection on the calling executor thread; writes that need a transaction BEGIN one explicitly"""
+        connection = sqlite3.connect(DB_PATH, isolation_level=None, cached_statements=256)
+        self.apply_pragmas(connection)
+        return connection
         
+    def apply_pragmas(self, connection):
+        """Switch a connection to WAL and the faster sync/cache settings"""
+        if DB_PATH == ':memory:':
+            return
+        cursor = connection.cursor()
+        for pragma in DB_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+        mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() != 'wal':
+            self.logger.warning(f"Could not enable WAL, journal mode is {mode}")
+    
     def setup_database(self):
         """Setup SQLite database for forwarding configuration"""
         try:
-            cursor = self.db_connection.cursor()
-            cursor.execute('''
+            # Base tables first, in their own transaction, so a failure in the
+            # later steps can't roll them back
+            self._write_conn.executescript('''
+                BEGIN IMMEDIATE;
+                
                 CREATE TABLE IF NOT EXISTS forwarding_rules (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     account_phone TEXT,
@@ -50,10 +243,8 @@ class TelegramForwardingManager:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     last_message_id INTEGER DEFAULT 0,
                     messages_forwarded INTEGER DEFAULT 0
-                )
-            ''')
-            
-            cursor.execute('''
+                );
+                
                 CREATE TABLE IF NOT EXISTS forwarded_messages (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     rule_id INTEGER,
@@ -65,11 +256,9 @@ class TelegramForwardingManager:
                     message_text TEXT,
                     forwarded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (rule_id) REFERENCES forwarding_rules (id)
-                )
-            ''')
-            
-            # Add error logging table
-            cursor.execute('''
+                );
+                
+                -- Error logging table
                 CREATE TABLE IF NOT EXISTS forwarding_errors (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     rule_id INTEGER,
@@ -77,14 +266,75 @@ class TelegramForwardingManager:
                     error_type TEXT,
                     error_message TEXT,
                     occurred_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
+                );
+                
+                COMMIT;
+            ''')
+            
+            # Bring older databases up to date before anything uses the new columns
+            self.migrate_columns()
+            
+            self._write_conn.executescript('''
+                BEGIN IMMEDIATE;
+                
+                -- Destinations and keywords per rule, so starting a rule needs no JSON
+                -- parsing; the JSON columns on forwarding_rules are still written.
+                -- position keeps destinations in the order the user entered them
+                CREATE TABLE IF NOT EXISTS rule_destinations (
+                    rule_id INTEGER,
+                    dest_chat_id INTEGER,
+                    position INTEGER,
+                    PRIMARY KEY (rule_id, dest_chat_id)
+                ) WITHOUT ROWID;
+                
+                CREATE TABLE IF NOT EXISTS rule_keywords (
+                    rule_id INTEGER,
+                    keyword TEXT,
+                    PRIMARY KEY (rule_id, keyword)
+                ) WITHOUT ROWID;
+                
+                -- Fill them in for rules created before they existed
+                INSERT OR IGNORE INTO rule_destinations (rule_id, dest_chat_id, position)
+                    SELECT r.id, d.value, d.key FROM forwarding_rules r, json_each(r.destination_chat_ids) d;
+                INSERT OR IGNORE INTO rule_keywords (rule_id, keyword)
+                    SELECT r.id, k.value FROM forwarding_rules r, json_each(r.keywords) k
+                    WHERE r.keywords IS NOT NULL;
+                
+                COMMIT;
             ''')
             
-            self.db_connection.commit()
+            # Indexes last, once every column they name is known to exist
+            self._write_conn.executescript('''
+                BEGIN IMMEDIATE;
+                
+                -- Indexes for the per-rule statistics and source message lookups; the
+                -- rule index covers every column the statistics query reads
+                DROP INDEX IF EXISTS idx_fwd_rule;
+                CREATE INDEX IF NOT EXISTS idx_fwd_rule_dest_time ON forwarded_messages(rule_id, destination_chat_id, forwarded_at);
+                CREATE INDEX IF NOT EXISTS idx_fwd_src ON forwarded_messages(source_chat_id, source_message_id);
+                CREATE INDEX IF NOT EXISTS idx_err_rule ON forwarding_errors(rule_id, occurred_at);
+                
+                COMMIT;
+                
+                -- Let the planner gather statistics for the indexes if they need it
+                PRAGMA optimize;
+            ''')
             self.logger.info("Database setup completed")
             
         except Exception as e:
-            print(f"Error setting up database: {e}")  # Fallback to print if logger fails
+            if self._write_conn.in_transaction:
+                self._write_conn.rollback()
+            # A half-built schema breaks every later query, so don't start on one
+            self.logger.error(f"Error setting up database: {e}")
+            raise
+    
+    def migrate_columns(self):
+        """Add any SCHEMA_MIGRATIONS columns the existing tables are missing"""
+        for table, column, column_type in SCHEMA_MIGRATIONS:
+            columns = {row[1] for row in self._write_conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self._write_conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                self.logger.info(f"Added column {table}.{column}")
     
     async def get_account_groups(self, account_phone):
         """Get all groups/channels the account is member of with enhanced error handling"""
@@ -155,19 +405,14 @@ class TelegramForwardingManager:
                                    destination_chat_ids, keywords=None):
         """Create a new forwarding rule with enhanced validation"""
         try:
-            cursor = self.db_connection.cursor()
-            
-            dest_ids_json = json.dumps(destination_chat_ids)
-            keywords_json = json.dumps(keywords) if keywords else None
-            
-            cursor.execute('''
-                INSERT INTO forwarding_rules 
-                (account_phone, source_chat_id, source_chat_name, destination_chat_ids, keywords)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (account_phone, source_chat_id, source_chat_name, dest_ids_json, keywords_json))
+            dest_ids_json = orjson.dumps(destination_chat_ids).decode()
+            keywords_json = orjson.dumps(keywords).decode() if keywords else None
             
-            rule_id = cursor.lastrowid
-            self.db_connection.commit()
+            rule_id = await self._write(self._insert_rule, account_phone, source_chat_id, source_chat_name, 
+                                        dest_ids_json, keywords_json, destination_chat_ids, keywords or [])
+            if self._rule_count is not None:
+                self._rule_count += 1
+            self._rules_version += 1
             
             self.logger.info(f"Created forwarding rule {rule_id} for {account_phone}")
             return rule_id
@@ -176,20 +421,60 @@ class TelegramForwardingManager:
             self.logger.error(f"Error creating forwarding rule: {e}")
             raise e
     
-    async def start_forwarding(self, rule_id):
-        """Start message forwarding for a specific rule with enhanced error handling"""
+    def _insert_rule(self, account_phone, source_chat_id, source_chat_name, dest_ids_json, keywords_json, 
+                     destination_chat_ids, keywords):
+        """Insert a rule and its destination and keyword rows in one transaction"""
         try:
-            cursor = self.db_connection.cursor()
-            cursor.execute('SELECT * FROM forwarding_rules WHERE id = ?', (rule_id,))
-            rule = cursor.fetchone()
+            self._write_conn.execute('BEGIN IMMEDIATE')
+            cursor = self._write_conn.execute('''
+                INSERT INTO forwarding_rules 
+                (account_phone, source_chat_id, source_chat_name, destination_chat_ids, keywords)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (account_phone, source_chat_id, source_chat_name, dest_ids_json, keywords_json))
+            rule_id = cursor.lastrowid
+            self._write_conn.executemany('INSERT OR IGNORE INTO rule_destinations (rule_id, dest_chat_id, position) VALUES (?, ?, ?)', 
+                                         [(rule_id, dest_chat_id, position) for position, dest_chat_id in enumerate(destination_chat_ids)])
+            self._write_conn.executemany('INSERT OR IGNORE INTO rule_keywords (rule_id, keyword) VALUES (?, ?)', 
+                                         [(rule_id, keyword) for keyword in keywords])
+            self._write_conn.commit()
+            return rule_id
+        except Exception:
+            self._write_conn.rollback()
+            raise
+    
+    def _fetch_rule_config(self, rule_id):
+        """Get a rule's account, source chat, last message id, destinations and keywords, or None if it doesn't exist"""
+        return self._fetch_rule_configs([rule_id]).get(rule_id)
+    
+    def _fetch_rule_configs(self, rule_ids):
+        """Get the _fetch_rule_config tuple for several rules with one query per table, keyed by rule id"""
+        placeholders = ', '.join('?' * len(rule_ids))
+        rules = self._read_cursor.execute(
+            f'SELECT id, account_phone, source_chat_id, last_message_id FROM forwarding_rules WHERE id IN ({placeholders})',
+            rule_ids).fetchall()
+        destinations = {rule[0]: [] for rule in rules}
+        keywords = {rule[0]: [] for rule in rules}
+        for rule_id, dest_chat_id in self._read_cursor.execute(
+                f'SELECT rule_id, dest_chat_id FROM rule_destinations WHERE rule_id IN ({placeholders}) ORDER BY rule_id, position', rule_ids):
+            destinations[rule_id].append(dest_chat_id)
+        for rule_id, keyword in self._read_cursor.execute(
+                f'SELECT rule_id, keyword FROM rule_keywords WHERE rule_id IN ({placeholders})', rule_ids):
+            keywords[rule_id].append(keyword)
+        return {
+            rule_id: (account_phone, source_chat_id, last_message_id or 0, destinations[rule_id], keywords[rule_id] or None)
+            for rule_id, account_phone, source_chat_id, last_message_id in rules
+        }
+    
+    async def start_forwarding(self, rule_id, update_status=True, rule=None):
+        """Start message forwarding for a specific rule; rule may be prefetched by _fetch_rule_configs"""
+        try:
+            if rule is None:
+                rule = await self._read(self._fetch_rule_config, rule_id)
             
             if not rule:
                 return False, "Rule not found"
             
-            account_phone = rule[1]
-            source_chat_id = rule[2]
-            destination_chat_ids = json.loads(rule[4])
-            keywords = json.loads(rule[5]) if rule[5] else None
+            account_phone, source_chat_id, last_message_id, destination_chat_ids, keywords = rule
             
             account = self.account_manager.get_account_by_phone(account_phone)
             if not account or not account['client']:
@@ -202,25 +487,44 @@ class TelegramForwardingManager:
             except Exception as e:
                 return False, f"Account connection error: {str(e)}"
             
-            # Update rule status
-            cursor.execute('UPDATE forwarding_rules SET status = ? WHERE id = ?', ('running', rule_id))
-            self.db_connection.commit()
-            
             # Start forwarding session
             session_key = f"{account_phone}_{rule_id}"
+            previous = self.forwarding_sessions.get(session_key)
+            if previous is not None:
+                self._remove_route(session_key, previous)
+            self._session_key_by_rule[rule_id] = session_key
             self.forwarding_sessions[session_key] = {
                 'rule_id': rule_id,
                 'account': account,
                 'source_chat_id': source_chat_id,
                 'destination_chat_ids': destination_chat_ids,
                 'keywords': keywords,
+                'keyword_re': re.compile('|'.join(re.escape(k) for k in keywords), re.IGNORECASE) if keywords else None,
                 'status': 'running',
+                'last_message_id': last_message_id,
                 'messages_forwarded': 0,
                 'last_activity': datetime.now()
             }
             
-            # Set up event handler
-            await self.setup_forwarding_handler(session_key)
+            # Set up event handler; the rule only counts as active once it is routed
+            routed = False
+            try:
+                routed = await self.setup_forwarding_handler(session_key)
+            finally:
+                if not routed:
+                    self.forwarding_sessions.pop(session_key, None)
+                    self._session_key_by_rule.pop(rule_id, None)
+                    if previous is not None:
+                        self.active_rule_count -= 1
+            if not routed:
+                return False, "Cannot access source chat"
+            if previous is None:
+                self.active_rule_count += 1
+            
+            # Update rule status
+            if update_status:
+                await self._write(self._write_conn.execute, UPDATE_STATUS_SQL, ('running', rule_id))
+                self._rules_version += 1
             
             self.logger.info(f"Started forwarding for rule {rule_id}")
             return True, "Forwarding started successfully"
@@ -231,8 +535,57 @@ class TelegramForwardingManager:
                           'start_error', str(e))
             return False, f"Error starting forwarding: {str(e)}"
     
+    async def start_forwarding_rules(self, rule_ids):
+        """Start several rules already marked running concurrently and return how many started"""
+        semaphore = asyncio.Semaphore(START_CONCURRENCY)
+        
+        # Read every rule up front instead of one lookup per start_forwarding
+        rules = await self._read(self._fetch_rule_configs, list(rule_ids)) if rule_ids else {}
+        
+        async def start(rule_id):
+            if rule_id not in rules:
+                return False, "Rule not found"
+            async with semaphore:
+                return await self.start_forwarding(rule_id, update_status=False, rule=rules[rule_id])
+        
+        results = await asyncio.gather(*(start(rule_id) for rule_id in rule_ids), return_exceptions=True)
+        
+        started = 0
+        failed = []
+        for rule_id, result in zip(rule_ids, results):
+            if isinstance(result, BaseException):
+                message = str(result)
+            elif result[0]:
+                started += 1
+                self.logger.info(f"✅ Resumed forwarding for rule {rule_id}")
+                continue
+            else:
+                message = result[1]
+            self.logger.error(f"❌ Failed to resume rule {rule_id}: {message}")
+            if rule_id in rules:
+                failed.append((rule_id, rules[rule_id][0], message))
+        
+        # The rules that started are already marked running, so only the failures
+        # change: their statuses and error rows go out in one transaction
+        if failed:
+            await self._write(self._record_failed_starts, failed)
+            self._rules_version += 1
+        return started
+    
+    def _record_failed_starts(self, failed):
+        """Mark (rule_id, account_phone, message) failures as errors in a single transaction; the connection is autocommit otherwise"""
+        try:
+            self._write_conn.execute('BEGIN IMMEDIATE')
+            self._write_conn.executemany(UPDATE_STATUS_SQL, [('error', rule_id) for rule_id, _, _ in failed])
+            self._write_conn.executemany(INSERT_ERROR_SQL, [(rule_id, phone, 'resume_error', message)
+                                                            for rule_id, phone, message in failed])
+            self._write_conn.commit()
+        except Exception:
+            self._write_conn.rollback()
+            raise
+    
     async def setup_forwarding_handler(self, session_key):
-        """Setup message forwarding event handler with enhanced debugging"""
+        """Setup message forwarding event handler with enhanced debugging; returns whether the session was routed"""
         try:
             session = self.forwarding_sessions[session_key]
             client = session['account']['client']
@@ -250,32 +603,24 @@ class TelegramForwardingManager:
                 
             except Exception as e:
                 self.logger.error(f"Cannot access source chat {source_chat_id}: {e}")
-                return
+                return False
             
-            @client.on(events.NewMessage(chats=source_chat_id))
-            async def message_handler(event):
+            # Resolve destinations once so forwards don't look them up each time
+            destination_peers = []
+            for dest_chat_id in session['destination_chat_ids']:
                 try:
-                    self.logger.info(f"🔥 NEW MESSAGE RECEIVED in session {session_key}")
-                    self.logger.info(f"Message ID: {event.message.id}")
-                    self.logger.info(f"Message text: {event.message.message[:100]}...")
-                    self.logger.info(f"From chat: {event.chat_id}")
-                    
-                    if session_key not in self.forwarding_sessions:
-                        self.logger.warning(f"Session {session_key} no longer exists")
-                        return
-                    
-                    if self.forwarding_sessions[session_key]['status'] != 'running':
-                        self.logger.warning(f"Session {session_key} is not running")
-                        return
-                    
-                    # Update last activity
-                    self.forwarding_sessions[session_key]['last_activity'] = datetime.now()
-                    
-                    await self.forward_message_to_destinations(session_key, event)
-                    
-                except Exception as e:
-                    self.logger.error(f"Error in message handler for session {session_key}: {e}")
-                    self.logger.error(traceback.format_exc())
+                    destination_peers.append((dest_chat_id, await client.get_input_entity(dest_chat_id)))
+                except ValueError as e:
+                    self.logger.warning(f"Dropping destination {dest_chat_id} for session {session_key}: {e}")
+                    self.log_error(rule_id, session['account']['phone'], 'invalid_peer', 
+                                   f"Destination {dest_chat_id}")
+            session['destination_peers'] = destination_peers
+            
+            # Route the source chat's messages to this session, and keep its
+            # input peer so forwards don't resolve the chat id again
+            session['source_peer'] = utils.get_input_peer(entity)
+            session['source_peer_id'] = utils.get_peer_id(entity)
+            self._add_route(client, session['source_peer_id'], session_key)
             
             self.logger.info(f"✅ Forwarding handler setup completed for session {session_key}")
             
@@ -289,99 +634,173 @@ class TelegramForwardingManager:
             except Exception as e:
                 self.logger.error(f"❌ Error testing message access: {e}")
             
+            return True
+            
         except Exception as e:
             self.logger.error(f"Error setting up forwarding handler for {session_key}: {e}")
             self.logger.error(traceback.format_exc())
             raise e
     
+    def _add_route(self, client, chat_id, session_key):
+        """Send a chat's new messages to a session, registering the client's dispatcher if needed"""
+        routes = self._client_routes.get(client)
+        if routes is None:
+            routes = self._client_routes[client] = {}
+            
+            async def dispatcher(event):
+                for session_key in tuple(routes.get(event.chat_id, ())):
+                    await self.handle_new_message(session_key, event)
+            
+            client.add_event_handler(dispatcher, events.NewMessage())
+            self._client_dispatchers[client] = dispatcher
+        routes.setdefault(chat_id, set()).add(session_key)
+    
+    def _remove_route(self, session_key, session):
+        """Stop routing to a session, unregistering the dispatcher once its client has no routes left"""
+        client = session['account']['client']
+        routes = self._client_routes.get(client)
+        if routes is None or 'source_peer_id' not in session:
+            return
+        
+        keys = routes.get(session['source_peer_id'])
+        if keys is not None:
+            keys.discard(session_key)
+            if not keys:
+                del routes[session['source_peer_id']]
+        if not routes:
+            del self._client_routes[client]
+            client.remove_event_handler(self._client_dispatchers.pop(client))
+    
+    async def handle_new_message(self, session_key, event):
+        """Handle a new message in a session's source chat"""
+        try:
+            # Runs for every message, so use lazy formatting and skip the text preview unless debugging
+            self.logger.info("🔥 New message %s from chat %s in session %s", event.message.id, event.chat_id, session_key)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"Message text: {(event.message.message or '')[:100]}...")
+            
+            if session_key not in self.forwarding_sessions:
+                self.logger.warning(f"Session {session_key} no longer exists")
+                return
+            
+            if self.forwarding_sessions[session_key]['status'] != 'running':
+                self.logger.warning(f"Session {session_key} is not running")
+                return
+            
+            # Update last activity
+            self.forwarding_sessions[session_key]['last_activity'] = datetime.now()
+            
+            await self.forward_message_to_destinations(session_key, event)
+            
+        except Exception as e:
+            self.logger.error(f"Error in message handler for session {session_key}: {e}")
+            self.logger.error(traceback.format_exc())
+    
     async def forward_message_to_destinations(self, session_key, event):
         """Forward message to all destination chats with enhanced error handling"""
         session = self.forwarding_sessions[session_key]
         client = session['account']['client']
-        keywords = session['keywords']
-        destination_chat_ids = session['destination_chat_ids']
+        keyword_re = session['keyword_re']
+        destination_peers = session['destination_peers']
+        source_peer = session['source_peer']
         rule_id = session['rule_id']
         
         try:
             message_text = event.message.message or ""
             
+            # Message ids only grow within a chat, so anything at or below the
+            # last one seen has already been handled
+            if event.message.id <= session['last_message_id']:
+                self.logger.info("Skipping already handled message %s for rule %s", event.message.id, rule_id)
+                return
+            session['last_message_id'] = event.message.id
+            
             # Check keywords filter
-            if keywords:
-                keyword_match = any(keyword.lower() in message_text.lower() for keyword in keywords)
-                if not keyword_match:
-                    self.logger.info(f"Message filtered out - no keyword match")
-                    return  # Message doesn't contain required keywords
+            if keyword_re and not keyword_re.search(message_text):
+                self.logger.info("Message filtered out - no keyword match")
+                return  # Message doesn't contain required keywords
             
             successful_forwards = 0
             failed_forwards = 0
+            flood_wait = 0
+            log_rows = []
+            error_rows = []
+            text_preview = message_text[:200]  # Store first 200 chars
+            phone = session['account']['phone']
+            slots = self._account_slots.get(phone)
+            if slots is None:
+                slots = self._account_slots[phone] = asyncio.Semaphore(ACCOUNT_FORWARD_SLOTS)
             
-            # Forward to each destination with individual error handling
-            for dest_chat_id in destination_chat_ids:
-                try:
-                    # Add delay to prevent rate limiting
-                    await asyncio.sleep(1)
-                    
-                    # Forward the original message
-                    forwarded_msg = await client.forward_messages(
-                        entity=dest_chat_id,
+            async def forward_one(dest_peer, position):
+                # Stagger the sends so a burst doesn't hit every chat at once
+                await asyncio.sleep(position * FORWARD_STAGGER)
+                async with slots:
+                    return await client.forward_messages(
+                        entity=dest_peer,
                         messages=event.message,
-                        from_peer=event.chat_id
+                        from_peer=source_peer
                     )
-                    
-                    # Log successful forward
-                    if forwarded_msg:
-                        self.log_forwarded_message(
-                            rule_id,
-                            session['account']['phone'],
-                            event.chat_id,
-                            event.message.id,
-                            dest_chat_id,
-                            forwarded_msg[0].id,
-                            message_text[:200]  # Store first 200 chars
-                        )
-                        successful_forwards += 1
-                        
-                        self.logger.info(f"✅ Message forwarded from {event.chat_id} to {dest_chat_id}")
-                    
-                except errors.FloodWaitError as e:
-                    self.logger.warning(f"Flood wait error for destination {dest_chat_id}: {e.seconds} seconds")
-                    self.log_error(rule_id, session['account']['phone'], 'flood_wait', 
-                                 f"Destination {dest_chat_id}: {e.seconds}s")
+            
+            # Forward to all destinations concurrently, then handle each result
+            results = await asyncio.gather(
+                *(forward_one(dest_peer, position) for position, (_, dest_peer) in enumerate(destination_peers)),
+                return_exceptions=True
+            )
+            
+            for (dest_chat_id, _), result in zip(destination_peers, results):
+                if isinstance(result, errors.FloodWaitError):
+                    self.logger.warning(f"Flood wait error for destination {dest_chat_id}: {result.seconds} seconds")
+                    error_rows.append((rule_id, phone, 'flood_wait', f"Destination {dest_chat_id}: {result.seconds}s"))
                     failed_forwards += 1
-                    # Wait for flood wait period
-                    await asyncio.sleep(min(e.seconds, 300))  # Max 5 minutes
+                    flood_wait = max(flood_wait, result.seconds)
                     
-                except errors.ChatWriteForbiddenError:
+                elif isinstance(result, errors.ChatWriteForbiddenError):
                     self.logger.warning(f"Cannot write to chat {dest_chat_id}")
-                    self.log_error(rule_id, session['account']['phone'], 'write_forbidden', 
-                                 f"Destination {dest_chat_id}")
+                    error_rows.append((rule_id, phone, 'write_forbidden', f"Destination {dest_chat_id}"))
                     failed_forwards += 1
                     
-                except errors.PeerIdInvalidError:
+                elif isinstance(result, errors.PeerIdInvalidError):
                     self.logger.warning(f"Invalid peer ID {dest_chat_id}")
-                    self.log_error(rule_id, session['account']['phone'], 'invalid_peer', 
-                                 f"Destination {dest_chat_id}")
+                    error_rows.append((rule_id, phone, 'invalid_peer', f"Destination {dest_chat_id}"))
                     failed_forwards += 1
                     
-                except Exception as e:
-                    self.logger.error(f"Error forwarding to {dest_chat_id}: {e}")
-                    self.log_error(rule_id, session['account']['phone'], 'forward_error', 
-                                 f"Destination {dest_chat_id}: {str(e)}")
+                elif isinstance(result, BaseException):
+                    self.logger.error(f"Error forwarding to {dest_chat_id}: {result}")
+                    error_rows.append((rule_id, phone, 'forward_error', f"Destination {dest_chat_id}: {str(result)}"))
                     failed_forwards += 1
+                    
+                elif result:
+                    # Log successful forward
+                    log_rows.append((
+                        rule_id,
+                        phone,
+                        event.chat_id,
+                        event.message.id,
+                        dest_chat_id,
+                        result[0].id,
+                        text_preview
+                    ))
+                    successful_forwards += 1
+                    
+                    self.logger.info("✅ Message forwarded from %s to %s", event.chat_id, dest_chat_id)
+            
+            if log_rows:
+                self.log_forwarded_messages(log_rows)
+            if error_rows:
+                self.log_errors(error_rows)
             
             # Update session statistics
             session['messages_forwarded'] += successful_forwards
             
-            # Update database statistics
-            cursor = self.db_connection.cursor()
-            cursor.execute('''
-                UPDATE forwarding_rules 
-                SET messages_forwarded = messages_forwarded + ? 
-                WHERE id = ?
-            ''', (successful_forwards, rule_id))
-            self.db_connection.commit()
+            # Update database statistics and the last seen message in one write
+            await self._write(self._write_conn.execute, UPDATE_COUNTERS_SQL,
+                              (successful_forwards, event.message.id, rule_id))
             
-            self.logger.info(f"Forwarding completed for rule {rule_id}: {successful_forwards} successful, {failed_forwards} failed")
+            self.logger.info("Forwarding completed for rule %s: %s successful, %s failed", rule_id, successful_forwards, failed_forwards)
+            
+            if flood_wait:
+                # Wait out the longest flood wait before handling the next message
+                await asyncio.sleep(min(flood_wait, 300))  # Max 5 minutes
             
         except Exception as e:
             self.logger.error(f"Error in forward_message_to_destinations: {e}")
@@ -389,39 +808,61 @@ class TelegramForwardingManager:
     
     def log_forwarded_message(self, rule_id, account_phone, source_chat_id, source_msg_id, 
                              dest_chat_id, dest_msg_id, message_text):
-        """Log forwarded message to database"""
-        try:
-            cursor = self.db_connection.cursor()
-            cursor.execute('''
-                INSERT INTO forwarded_messages 
-                (rule_id, account_phone, source_chat_id, source_message_id, 
-                 destination_chat_id, destination_message_id, message_text)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (rule_id, account_phone, source_chat_id, source_msg_id, 
-                  dest_chat_id, dest_msg_id, message_text))
-            self.db_connection.commit()
-        except Exception as e:
-            self.logger.error(f"Error logging forwarded message: {e}")
+        """Queue a forwarded message for the next batched log write"""
+        self.log_forwarded_messages([(rule_id, account_phone, source_chat_id, source_msg_id, 
+                                      dest_chat_id, dest_msg_id, message_text)])
+    
+    def log_forwarded_messages(self, rows):
+        """Queue several forwarded message rows at once, e.g. all destinations of one message"""
+        self._pending_logs.extend(rows)
+        if len(self._pending_logs) >= LOG_FLUSH_ROWS:
+            self._logs_full.set()
     
     def log_error(self, rule_id, account_phone, error_type, error_message):
-        """Log error to database"""
+        """Queue an error for the next batched log write"""
+        self.log_errors([(rule_id, account_phone, error_type, error_message)])
+    
+    def log_errors(self, rows):
+        """Queue several error rows at once, e.g. all failed destinations of one message"""
+        self._pending_errors.extend(rows)
+        if len(self._pending_errors) >= LOG_FLUSH_ROWS:
+            self._logs_full.set()
+    
+    async def flush_logs(self):
+        """Write all queued forward and error log rows in one transaction"""
+        if not self._write_conn or not (self._pending_logs or self._pending_errors):
+            return
+        
+        logs, self._pending_logs = self._pending_logs, []
+        errors, self._pending_errors = self._pending_errors, []
+        await self._write(self._write_log_rows, logs, errors)
+    
+    def _write_log_rows(self, logs, errors):
         try:
-            cursor = self.db_connection.cursor()
-            cursor.execute('''
-                INSERT INTO forwarding_errors 
-                (rule_id, account_phone, error_type, error_message)
-                VALUES (?, ?, ?, ?)
-            ''', (rule_id, account_phone, error_type, error_message))
-            self.db_connection.commit()
+            self._write_conn.execute('BEGIN IMMEDIATE')
+            if logs:
+                self._write_conn.executemany(INSERT_FORWARD_SQL, logs)
+            if errors:
+                self._write_conn.executemany(INSERT_ERROR_SQL, errors)
+            self._write_conn.commit()
         except Exception as e:
-            self.logger.error(f"Error logging error: {e}")
+            self._write_conn.rollback()
+            self.logger.error(f"Error logging {len(logs)} forwarded messages and {len(errors)} errors: {e}")
+    
+    async def _log_flusher(self):
+        """Flush buffered log rows on a short interval, or early when the buffer fills"""
+        while True:
+            try:
+                await asyncio.wait_for(self._logs_full.wait(), timeout=LOG_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._logs_full.clear()
+            await self.flush_logs()
     
     async def stop_forwarding(self, rule_id):
         """Stop forwarding for a specific rule"""
         try:
-            cursor = self.db_connection.cursor()
-            cursor.execute('SELECT account_phone FROM forwarding_rules WHERE id = ?', (rule_id,))
-            result = cursor.fetchone()
+            result = await self._read(self._fetchone, 'SELECT account_phone FROM forwarding_rules WHERE id = ?', (rule_id,))
             
             if not result:
                 return False, "Rule not found"
@@ -430,13 +871,15 @@ class TelegramForwardingManager:
             session_key = f"{account_phone}_{rule_id}"
             
             # Update rule status
-            cursor.execute('UPDATE forwarding_rules SET status = ? WHERE id = ?', ('stopped', rule_id))
-            self.db_connection.commit()
+            await self._write(self._write_conn.execute, UPDATE_STATUS_SQL, ('stopped', rule_id))
+            self._rules_version += 1
             
             # Remove session
             if session_key in self.forwarding_sessions:
                 self.forwarding_sessions[session_key]['status'] = 'stopped'
-                del self.forwarding_sessions[session_key]
+                self._remove_route(session_key, self.forwarding_sessions.pop(session_key))
+                self._session_key_by_rule.pop(rule_id, None)
+                self.active_rule_count -= 1
             
             self.logger.info(f"Stopped forwarding for rule {rule_id}")
             return True, "Forwarding stopped successfully"
@@ -445,34 +888,72 @@ class TelegramForwardingManager:
             self.logger.error(f"Error stopping forwarding for rule {rule_id}: {e}")
             return False, f"Error stopping forwarding: {str(e)}"
     
+    async def delete_forwarding_rule(self, rule_id):
+        """Stop a rule if it is running and delete it"""
+        await self.stop_forwarding(rule_id)
+        if await self._write(self._delete_rule_rows, rule_id) and self._rule_count is not None:
+            self._rule_count -= 1
+        self._rules_version += 1
+        self.logger.info(f"Deleted forwarding rule {rule_id}")
+    
+    def _delete_rule_rows(self, rule_id):
+        """Delete a rule with its destination and keyword rows in one transaction, returning how many rules were deleted"""
+        try:
+            self._write_conn.execute('BEGIN IMMEDIATE')
+            self._write_conn.execute('DELETE FROM rule_destinations WHERE rule_id = ?', (rule_id,))
+            self._write_conn.execute('DELETE FROM rule_keywords WHERE rule_id = ?', (rule_id,))
+            deleted = self._write_conn.execute('DELETE FROM forwarding_rules WHERE id = ?', (rule_id,)).rowcount
+            self._write_conn.commit()
+            return deleted
+        except Exception:
+            self._write_conn.rollback()
+            raise
+    
+    async def get_forwarded_message_counts(self):
+        """Get the total number of forwarded messages and the number in the last day"""
+        return await self._read(self._fetchone, '''
+            SELECT COUNT(*),
+                   COUNT(CASE WHEN forwarded_at >= datetime('now', '-1 day') THEN 1 END)
+            FROM forwarded_messages
+        ''')
+    
     async def get_forwarding_rules(self, account_phone=None):
         """Get all forwarding rules with enhanced information"""
+        # No rules, or the database isn't open yet (count not loaded)
+        if not self._rule_count:
+            return []
+        
         try:
-            cursor = self.db_connection.cursor()
-            
-            if account_phone:
-                cursor.execute('SELECT * FROM forwarding_rules WHERE account_phone = ? ORDER BY created_at DESC', (account_phone,))
+            # Cache the row tuples rather than the dicts built from them, so a
+            # caller editing a returned rule can't change what the next one gets
+            version = self._rules_version
+            cached = self._rules_cache.get(account_phone)
+            if cached and cached[0] == version and time.monotonic() - cached[1] < RULES_CACHE_TTL:
+                rules = cached[2]
             else:
-                cursor.execute('SELECT * FROM forwarding_rules ORDER BY created_at DESC')
-            
-            rules = cursor.fetchall()
-            
-            formatted_rules = []
-            for rule in rules:
-                formatted_rules.append({
-                    'id': rule[0],
-                    'account_phone': rule[1],
-                    'source_chat_id': rule[2],
-                    'source_chat_name': rule[3],
-                    'destination_chat_ids': json.loads(rule[4]),
-                    'keywords': json.loads(rule[5]) if rule[5] else None,
-                    'status': rule[6],
-                    'created_at': rule[7],
-                    'last_message_id': rule[8],
-                    'messages_forwarded': rule[9] if len(rule) > 9 else 0
-                })
-            
-            return formatted_rules
+                if account_phone:
+                    rules = await self._read(self._fetchall, SELECT_RULES_SQL + ' WHERE account_phone = ? ORDER BY created_at DESC', (account_phone,))
+                else:
+                    rules = await self._read(self._fetchall, SELECT_RULES_SQL + ' ORDER BY created_at DESC')
+                self._rules_cache[account_phone] = (version, time.monotonic(), rules)
+            
+            # Unpack the tuples straight into the result dicts in one pass
+            return [
+                {
+                    'id': rule_id,
+                    'account_phone': phone,
+                    'source_chat_id': source_chat_id,
+                    'source_chat_name': source_chat_name,
+                    'destination_chat_ids': list(_parse_json_list(destinations_json)),
+                    'keywords': list(_parse_json_list(keywords_json)) if keywords_json else None,
+                    'status': status,
+                    'created_at': created_at,
+                    'last_message_id': last_message_id,
+                    'messages_forwarded': messages_forwarded or 0
+                }
+                for (rule_id, phone, source_chat_id, source_chat_name, destinations_json, keywords_json,
+                     status, created_at, last_message_id, messages_forwarded) in rules
+            ]
             
         except Exception as e:
             self.logger.error(f"Error getting forwarding rules: {e}")
@@ -480,70 +961,48 @@ class TelegramForwardingManager:
     
     async def get_forwarding_statistics(self, rule_id=None):
         """Get comprehensive forwarding statistics"""
+        if not self._initialized:
+            return dict(EMPTY_STATISTICS)
+        
         try:
-            cursor = self.db_connection.cursor()
-            
+            # Forward and error statistics come back from one query
             if rule_id:
                 # Statistics for specific rule
-                cursor.execute('''
-                    SELECT COUNT(*) as total_forwarded,
-                           COUNT(DISTINCT destination_chat_id) as unique_destinations,
-                           MIN(forwarded_at) as first_forward,
-                           MAX(forwarded_at) as last_forward
-                    FROM forwarded_messages 
-                    WHERE rule_id = ?
-                ''', (rule_id,))
+                stats = await self._read(self._fetchone, STATS_BY_RULE_SQL, (rule_id, rule_id))
             else:
                 # Global statistics
-                cursor.execute('''
-                    SELECT COUNT(*) as total_forwarded,
-                           COUNT(DISTINCT destination_chat_id) as unique_destinations,
-                           MIN(forwarded_at) as first_forward,
-                           MAX(forwarded_at) as last_forward
-                    FROM forwarded_messages
-                ''')
-            
-            stats = cursor.fetchone()
-            
-            # Get error statistics
-            if rule_id:
-                cursor.execute('SELECT COUNT(*) FROM forwarding_errors WHERE rule_id = ?', (rule_id,))
-            else:
-                cursor.execute('SELECT COUNT(*) FROM forwarding_errors')
-            
-            error_count = cursor.fetchone()[0]
+                stats = await self._read(self._fetchone, STATS_SQL)
             
             return {
-                'total_forwarded': stats[0] if stats else 0,
-                'unique_destinations': stats[1] if stats else 0,
-                'first_forward': stats[2] if stats else None,
-                'last_forward': stats[3] if stats else None,
-                'total_errors': error_count
+                'total_forwarded': stats[0],
+                'unique_destinations': stats[1],
+                'first_forward': stats[2],
+                'last_forward': stats[3],
+                'total_errors': stats[4]
             }
             
         except Exception as e:
             self.logger.error(f"Error getting forwarding statistics: {e}")
-            return {
-                'total_forwarded': 0,
-                'unique_destinations': 0,
-                'first_forward': None,
-                'last_forward': None,
-                'total_errors': 0
-            }
+            return dict(EMPTY_STATISTICS)
     
     async def test_forwarding_manually(self, rule_id):
         """Manually test forwarding by getting the latest message"""
         try:
-            cursor = self.db_connection.cursor()
-            cursor.execute('SELECT * FROM forwarding_rules WHERE id = ?', (rule_id,))
-            rule = cursor.fetchone()
-            
-            if not rule:
-                return False, "Rule not found"
-            
-            account_phone = rule[1]
-            source_chat_id = rule[2]
-            destination_chat_ids = json.loads(rule[4])
+            # A running rule already has everything in its session; otherwise read
+            # the rule the same way start_forwarding does, so the destinations come
+            # in the same order either way
+            session = self.forwarding_sessions.get(self._session_key_by_rule.get(rule_id))
+            if session:
+                account_phone = session['account']['phone']
+                source_chat_id = session['source_chat_id']
+                destination_chat_ids = session['destination_chat_ids']
+            else:
+                rule = await self._read(self._fetch_rule_config, rule_id)
+                
+                if not rule:
+                    return False, "Rule not found"
+                
+                account_phone, source_chat_id, _, destination_chat_ids, _ = rule
             
             account = self.account_manager.get_account_by_phone(account_phone)
             if not account or not account['client']:
@@ -13,7 +13,7 @@ class TelegramManagerBot:
     def __init__(self, config):
         self.config = config
         self.bot_token = config['bot_token']
-        self.authorized_users = config['authorized_users']
+        self.authorized_users = frozenset(int(u) for u in config['authorized_users'])
         self.application = None
         
         # Initialize managers
@@ -618,7 +618,7 @@ class TelegramManagerBot:
             await query.edit_message_text("⏳ Refreshing account connections...")
             
             # Test all account connections
-            for account in self.account_manager.accounts:
+            for account in list(self.account_manager.accounts):
                 await self.account_manager.test_account_connection(account)
             
             await asyncio.sleep(2)  # Give time for connections to establish
@@ -634,7 +634,7 @@ class TelegramManagerBot:
             await query.edit_message_text("⏳ Testing account connections...")
             
             results = []
-            for account in self.account_manager.accounts:
+            for account in list(self.account_manager.accounts):
                 try:
                     success = await self.account_manager.test_account_connection(account)
                     status = "✅ Connected" if success else "❌ Failed"
@@ -665,7 +665,7 @@ class TelegramManagerBot:
             
             # First ensure accounts are connected
             active_accounts = []
-            for account in self.account_manager.accounts:
+            for account in list(self.account_manager.accounts):
                 if account['status'] == 'active' and account['client']:
                     try:
                         if await account['client'].is_user_authorized():
@@ -1167,13 +1167,8 @@ class TelegramManagerBot:
     async def delete_rule(self, query, rule_id):
         """Delete a forwarding rule"""
         try:
-            # Stop the rule first
-            await self.forwarding_manager.stop_forwarding(rule_id)
-            
-            # Delete from database
-            cursor = self.forwarding_manager.db_connection.cursor()
-            cursor.execute('DELETE FROM forwarding_rules WHERE id = ?', (rule_id,))
-            self.forwarding_manager.db_connection.commit()
+            # Stops the rule first, then deletes it
+            await self.forwarding_manager.delete_forwarding_rule(rule_id)
             
             await query.answer("✅ Rule deleted!")
             await self.view_forwarding_rules(query)
@@ -1223,15 +1218,7 @@ class TelegramManagerBot:
                 active_rules = len([r for r in rules if r['status'] == 'running'])
                 
                 # Get message statistics
-                cursor = self.forwarding_manager.db_connection.cursor()
-                cursor.execute('SELECT COUNT(*) FROM forwarded_messages')
-                total_forwarded = cursor.fetchone()[0]
-                
-                cursor.execute('''
-                    SELECT COUNT(*) FROM forwarded_messages 
-                    WHERE forwarded_at >= datetime('now', '-1 day')
-                ''')
-                forwarded_today = cursor.fetchone()[0]
+                total_forwarded, forwarded_today = await self.forwarding_manager.get_forwarded_message_counts()
                 
                 stats_text += (
                     f"**Rule Summary:**\n"
@@ -1275,17 +1262,7 @@ class TelegramManagerBot:
             
             progress_msg = await update.message.reply_text("⏳ Resuming forwarding rules...")
             
-            resumed = 0
-            for rule in active_rules:
-                try:
-                    success, message = await self.forwarding_manager.start_forwarding(rule['id'])
-                    if success:
-                        resumed += 1
-                        logging.info(f"✅ Resumed forwarding for rule {rule['id']}")
-                    else:
-                        logging.error(f"❌ Failed to resume rule {rule['id']}: {message}")
-                except Exception as e:
-                    logging.error(f"Error resuming rule {rule['id']}: {e}")
+            resumed = await self.forwarding_manager.start_forwarding_rules([rule['id'] for rule in active_rules])
             
             await progress_msg.edit_text(
                 f"✅ **Forwarding Resume Complete**\n\n"
@@ -1473,3 +1450,4 @@ class TelegramManagerBot:
             if self.application:
                 await self.application.stop()
                 await self.application.shutdown()
+            await self.forwarding_manager.close()